@@ -1,9 +1,15 @@
 import json
+import os
+import sys
 import chromadb
 from chromadb.utils import embedding_functions
 import pandas as pd
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from streamlit_functions.rcm_items import ID_PREFIXES, process_key, generate_id as scoped_id
+from streamlit_functions import rcm_relations
+
 # Load RCM data
 with open('rcm_output.json', 'r') as f:
     rcm_data = json.load(f)
@@ -81,6 +87,11 @@ for process_index, process in enumerate(rcm_data):
             metadatas=[{'control_id': risk['control_id'], 'process_id': process_id, 'name': risk['name']}]
         )
 
+# Relationship reports run against the indexed SQLite mirror (one query each) instead of one
+# Chroma `where` call per control or process
+relations_db = os.path.join("./chroma_db", rcm_relations.RELATIONS_DB)
+rcm_relations.sync_rcm_relations(rcm_data, relations_db)
+
 print("Chroma DB initialization complete.")
 
 # Example queries
@@ -94,19 +105,29 @@ def print_query_results(results):
         print(f"Metadata: {results['metadatas'][i]}")
         print("---")
 
+def print_rows(rows):
+    if not rows:
+        print("No results found.")
+        return
+    for row in rows:
+        print(f"ID: {row['id']}")
+        print(f"Name: {row['name']}")
+        print(f"Description: {row['description']}")
+        print("---")
+
 print("\nExample Queries:")
 
+first_process_key = process_key(rcm_data[0]['process_name'])
+first_process_id = scoped_id(ID_PREFIXES['process'], first_process_key, 0)
+first_standard_id = scoped_id(ID_PREFIXES['standard'], first_process_key, 0)
+
 # 1. Find all controls related to a specific standard
 print("1. Controls related to the first standard:")
-standard_id = collections['standards'].get(limit=1)['ids'][0]
-controls = collections['controls'].get(where={"standard_id": standard_id})
-print_query_results(controls)
+print_rows(rcm_relations.controls_for_standard(relations_db, first_standard_id))
 
 # 2. Retrieve risks associated with a particular process
 print("\n2. Risks associated with the first process:")
-process_id = collections['processes'].get()['ids'][0]
-risks = collections['risks'].get(where={"process_id": process_id})
-print_query_results(risks)
+print_rows(rcm_relations.risks_for_process(relations_db, first_process_id))
 
 # 3. Search for requirements containing specific keywords across all standards
 print("\n3. Requirements containing 'security':")
@@ -115,24 +136,14 @@ print_query_results(requirements)
 
 # 4. Identify controls that address multiple risks
 print("\n4. Controls addressing multiple risks:")
-all_controls = collections['controls'].get()
-control_risk_count = {}
-for control_id in all_controls['ids']:
-    risks = collections['risks'].get(where={"control_id": control_id})
-    risk_count = len(risks['ids'])
-    if risk_count > 1:
-        control_risk_count[control_id] = risk_count
-
-for control_id, risk_count in sorted(control_risk_count.items(), key=lambda x: x[1], reverse=True)[:5]:
-    print(f"Control ID: {control_id}, Number of risks addressed: {risk_count}")
-    control_info = collections['controls'].get(ids=[control_id])
-    print(f"Control description: {control_info['documents'][0]}")
+for control in rcm_relations.controls_addressing_multiple_risks(relations_db, limit=5):
+    print(f"Control ID: {control['id']}, Number of risks addressed: {control['risk_count']}")
+    print(f"Control description: {control['description']}")
     print("---")
 
 # 5. Find all standards related to a specific process
 print("\n5. Standards related to the first process:")
-standards = collections['standards'].get(where={"process_id": process_id})
-print_query_results(standards)
+print_rows(rcm_relations.standards_for_process(relations_db, first_process_id))
 
 # 6. Search for controls containing specific keywords
 print("\n6. Controls containing 'monitoring':")
@@ -141,28 +152,18 @@ print_query_results(monitoring_controls)
 
 # 7. Find requirements for a specific standard
 print("\n7. Requirements for the first standard:")
-requirements = collections['requirements'].get(where={"standard_id": standard_id})
-print_query_results(requirements)
+print_rows(rcm_relations.requirements_for_standard(relations_db, first_standard_id))
 
 # 8. Identify processes with the most standards
 print("\n8. Processes with the most standards:")
-process_standard_count = {}
-for process in collections['processes'].get()['ids']:
-    standards = collections['standards'].get(where={"process_id": process})
-    process_standard_count[process] = len(standards['ids'])
-
-for process_id, standard_count in sorted(process_standard_count.items(), key=lambda x: x[1], reverse=True)[:5]:
-    process_info = collections['processes'].get(ids=[process_id])
-    print(f"Process: {process_info['documents'][0]}, Number of standards: {standard_count}")
+for process in rcm_relations.standard_counts_per_process(relations_db, limit=5):
+    print(f"Process: {process['name']}, Number of standards: {process['standard_count']}")
 
 # 9. Find risks without associated controls
 print("\n9. Risks without associated controls:")
-all_risks = collections['risks'].get()
-risks_without_controls = [risk_id for risk_id, control_id in zip(all_risks['ids'], all_risks['metadatas']) if not control_id.get('control_id')]
-for risk_id in risks_without_controls[:5]:
-    risk_info = collections['risks'].get(ids=[risk_id])
-    print(f"Risk ID: {risk_id}")
-    print(f"Risk description: {risk_info['documents'][0]}")
+for risk in rcm_relations.risks_without_controls(relations_db)[:5]:
+    print(f"Risk ID: {risk['id']}")
+    print(f"Risk description: {risk['description']}")
     print("---")
 
 # 10. Search for similar processes
@@ -1,23 +1,27 @@
 import json
 import chromadb
-from chromadb.utils import embedding_functions
 import pandas as pd
 import numpy as np
 import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from streamlit_functions.embedding_service import get_embedding_service
 
 # Initialize Chroma client with persistence
 client = chromadb.PersistentClient(path="./chroma_db")
 
-# Create embedding function
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# Embedding service shared with the index build; queries are cached on disk across runs
+embedding_service = get_embedding_service(query_cache_path="query_embeddings.sqlite3")
 
-# Get the risks collection
-risks_collection = client.get_collection('risks', embedding_function=embedding_function)
+# Get the risks collection, checking it was built with the same model
+risks_collection = embedding_service.bind(client.get_collection('risks', embedding_function=embedding_service.embedding_function()))
 
 # Query for risks related to identity access management
 query_text = "strategy"
 results = risks_collection.query(
-    query_texts=[query_text],
+    query_embeddings=[embedding_service.embed_query(query_text)],
     n_results=5,  # Adjust this number as needed
     include=["documents", "metadatas", "distances"]
 )
@@ -37,3 +41,5 @@ for i, (risk_id, document, metadata, distance) in enumerate(zip(results['ids'][0
     similarity = calculate_similarity(distance)
     similarity_percentage = similarity * 100
     print(f"   Similarity: {similarity_percentage:.2f}%")
+
+print(f"\nEmbedding service: {embedding_service.stats()}")
@@ -1,26 +0,0 @@
-def search_inventory(query):
-    # This is a placeholder function. You'll need to implement the actual search logic
-    # to find and return relevant risks, controls, and standards based on the query.
-    sample_results = [
-        {
-            "type": "Risk",
-            "name": "Data Breach",
-            "process": "Information Security",
-            "related_items": ["Access Control", "Encryption", "Employee Training"]
-        },
-        {
-            "type": "Control",
-            "name": "Regular Password Updates",
-            "process": "User Management",
-            "related_items": ["Data Breach", "Access Control Policy"]
-        },
-        {
-            "type": "Standard",
-            "name": "ISO 27001",
-            "process": "Information Security Management",
-            "related_items": ["Risk Assessment", "Asset Management", "Access Control"]
-        }
-    ]
-    return sample_results
-
-# You can add more helper functions here as needed
\ No newline at end of file
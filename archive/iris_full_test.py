@@ -13,25 +13,33 @@ from tqdm.auto import tqdm
 import PyPDF2
 import json
 import chromadb
-from chromadb.utils import embedding_functions
 import pandas as pd
 import numpy as np
 import math
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from streamlit_functions.embedding_service import get_embedding_service
+from streamlit_functions.vector_store import get_collection
+from streamlit_functions.llm_telemetry import tracked_create
+from streamlit_functions.llm_client import get_instructor_client
+from streamlit_functions.data_access import load_gap_analysis_rubrics
 
 load_dotenv()
 api_key = os.getenv('open_ai')
 
-instructor_client = instructor.patch(AsyncOpenAI(api_key=api_key))
+# Shared, rate-limited client: throttled rubric calls are retried rather than failing the run
+instructor_client = get_instructor_client()
 
-# Initialize Chroma client with persistence
-client = chromadb.PersistentClient(path="./chroma_db")
+# Chroma client and collection handles come from the shared pool, opened once per process
+CHROMA_PATH = "./chroma_db"
 
-# Create embedding function
-embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+# Requirement texts are queried against several collections and rubric passes; the service
+# encodes each once and caches it on disk
+embedding_service = get_embedding_service(query_cache_path="query_embeddings.sqlite3")
 
 # Import the gap analysis rubrics and standard requirements
-with open('gap_analysis_rubrics.json', 'r') as f:
-    gap_analysis_rubrics = json.load(f)
+gap_analysis_rubrics = load_gap_analysis_rubrics('gap_analysis_rubrics.json')
 
 with open('standard_requirements.json', 'r') as f:
     standard_requirements = json.load(f)
@@ -61,7 +69,8 @@ async def perform_gap_analysis(requirement: str, internal_facts: Dict[str, List[
     gap_analyses = []
     for question_dict in rubric:
         question = question_dict['question']
-        response = await instructor_client.chat.completions.create(
+        response = await tracked_create(
+            instructor_client, "perform_gap_analysis",
             model="gpt-4o",
             response_model=GapAnswer,
             messages=[
@@ -74,9 +83,9 @@ async def perform_gap_analysis(requirement: str, internal_facts: Dict[str, List[
     return FullGapAnalysis(requirement=requirement, internal_facts=internal_facts, external_dot_point=external_dot_point, gap_analysis=gap_analyses)
 
 async def get_relevant_items(collection_name: str, query_text: str, n_results: int = 2) -> List[Dict[str, str]]:
-    collection = client.get_collection(collection_name, embedding_function=embedding_function)
+    collection = get_collection(CHROMA_PATH, collection_name, embedding_service, backend="chroma", create=False)
     results = collection.query(
-        query_texts=[query_text],
+        query_embeddings=[embedding_service.embed_query(query_text)],
         n_results=n_results,
         include=["documents", "metadatas"]
     )
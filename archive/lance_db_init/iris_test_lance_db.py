@@ -10,19 +10,43 @@ import json
 from dotenv import load_dotenv
 import lancedb
 from tqdm.auto import tqdm
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from streamlit_functions.embedding_service import get_embedding_service
+from streamlit_functions.quantized_index import QuantizedIndex, MODES, ROWS_FILE
+from streamlit_functions.data_access import load_gap_analysis_rubrics
 
 load_dotenv()
 api_key = os.getenv('open_ai')
 
 instructor_client = instructor.patch(AsyncOpenAI(api_key=api_key))
 
+# Same model and query prompt as lance_db_init.py
+embedding_service = get_embedding_service("stella")
+
+# Quantized first-pass index built by `lance_db_init.py --quantize {int8,binary}`. When present it
+# serves retrieval instead of the float32 table: compact codes in memory, float32 rescoring of the
+# candidates from disk. IRIS_QUANTIZED_INDEX picks the mode (default: whichever was built, int8
+# first); set it to "none" to search the LanceDB table.
+QUANTIZED_MODE = os.getenv('IRIS_QUANTIZED_INDEX')
+
+def get_quantized_index():
+    modes = [QUANTIZED_MODE] if QUANTIZED_MODE else list(MODES)
+    for mode in modes:
+        path = f"./lancedb/rcm_data_{mode}"
+        if mode in MODES and os.path.exists(os.path.join(path, ROWS_FILE)):
+            embedding_service.check_index_tag(os.path.join(path, "embedding.json"))
+            return QuantizedIndex(path)
+    return None
+
 # Connect to LanceDB
 def get_lancedb():
+    embedding_service.check_index_tag("./lancedb/rcm_data.embedding.json")
     return lancedb.connect("./lancedb")
 
 # Import the gap analysis rubrics and standard requirements
-with open('./../gap_analysis_rubrics.json', 'r') as f:
-    gap_analysis_rubrics = json.load(f)
+gap_analysis_rubrics = load_gap_analysis_rubrics('./../gap_analysis_rubrics.json')
 
 with open('./../standard_requirements.json', 'r') as f:
     standard_requirements = json.load(f)
@@ -63,9 +87,12 @@ async def perform_gap_analysis(requirement: str, internal_facts: Dict[str, List[
     
     return FullGapAnalysis(requirement=requirement, internal_facts=internal_facts, external_dot_point=external_dot_point, gap_analysis=gap_analyses)
 
-def get_relevant_items(db: lancedb.db.DBConnection, query_text: str, n_results: int = 2) -> List[Dict[str, str]]:
-    table = db.open_table("rcm_data")
-    results = table.search(query_text).limit(n_results).to_list()
+def get_relevant_items(db, query_text: str, n_results: int = 2) -> List[Dict[str, str]]:
+    if isinstance(db, QuantizedIndex):
+        results = [hit['row'] for hit in db.search(embedding_service.embed_query(query_text), n_results)[0]]
+    else:
+        table = db.open_table("rcm_data")
+        results = table.search(embedding_service.embed_query(query_text), vector_column_name="embedding").limit(n_results).to_list()
     return [{"document": f"{item['risk_name']} - {item['risk_description']}" if 'risk_name' in item else f"{item['control_name']} - {item['control_description']}" if 'control_name' in item else f"{item['standard_name']} - {item['requirement_description']}", 
              "description": item['risk_description'] if 'risk_description' in item else item['control_description'] if 'control_description' in item else item['requirement_description']} 
             for item in results]
@@ -73,14 +100,14 @@ def get_relevant_items(db: lancedb.db.DBConnection, query_text: str, n_results:
 async def analyze_all_gaps():
     all_analyses = []
     n_relevant_items = 3
-    db = get_lancedb()
+    db = get_quantized_index() or get_lancedb()
     
     for requirement in tqdm(standard_requirements[:5]):  # Analyze first 5 requirements for brevity
         if requirement['isRelevantforStandard']:
             # Retrieve relevant risks, controls, and standards
-            risks = await get_relevant_items(db, requirement['text'], n_relevant_items)
-            controls = await get_relevant_items(db, requirement['text'], n_relevant_items)
-            standards = await get_relevant_items(db, requirement['text'], n_relevant_items)
+            risks = get_relevant_items(db, requirement['text'], n_relevant_items)
+            controls = get_relevant_items(db, requirement['text'], n_relevant_items)
+            standards = get_relevant_items(db, requirement['text'], n_relevant_items)
             
             internal_facts = {
                 'risks': [item['document'] for item in risks],
@@ -1,10 +1,26 @@
 import asyncio
 import json
 import lancedb
-from sentence_transformers import SentenceTransformer
-import torch
+import os
+import shutil
+import sys
 
-async def initialize_lancedb():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from streamlit_functions.embedding_service import get_embedding_service
+from streamlit_functions.quantized_index import QuantizedIndex, MODES, recall_report, perturbed_queries
+import numpy as np
+
+# Recall is measured on the gap analysis queries iris_test_lance_db actually runs; without them,
+# on perturbed copies of indexed vectors (an indexed vector would trivially find itself)
+def recall_queries(embedding_service, embeddings, path="./../standard_requirements.json"):
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            texts = [requirement["text"] for requirement in json.load(file)]
+        if texts:
+            return np.asarray(embedding_service.embed_queries(texts), dtype=np.float32)
+    return perturbed_queries(embeddings, min(100, len(embeddings)))
+
+async def initialize_lancedb(quantize=None):
     # Connect to LanceDB
     db = await lancedb.connect_async("./lancedb")
 
@@ -12,54 +28,68 @@ async def initialize_lancedb():
     with open("./../chroma_init/rcm_output.json", "r") as file:
         data = json.load(file)
 
-    # Initialize the SentenceTransformer model
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = SentenceTransformer("dunzhang/stella_en_400M_v5", trust_remote_code=True).to(device)
-    print(f"Using device: {device}")
-    query_prompt_name = "s2p_query"
+    # stella: documents are embedded as-is, queries with the s2p_query prompt (see embedding_service)
+    embedding_service = get_embedding_service("stella")
 
-    # Flatten the nested structure and generate embeddings
+    # Flatten the nested structure; texts are embedded afterwards in one batched pass
     flattened_data = []
+    texts = []
     for process in data:
         for standard_list in process["list_standards"]:
             for standard in standard_list["standard"]:
                 for requirement in standard["requirements"]:
-                    text = f"{requirement['name']} {requirement['description']}"
-                    embedding = model.encode(text, prompt_name=query_prompt_name).tolist()
+                    texts.append(f"{requirement['name']} {requirement['description']}")
                     flattened_data.append({
                         "process_name": process["process_name"],
                         "standard_id": standard["id"],
                         "standard_name": standard["name"],
                         "requirement_id": requirement["id"],
                         "requirement_name": requirement["name"],
-                        "requirement_description": requirement["description"],
-                        "embedding": embedding
+                        "requirement_description": requirement["description"]
                     })
             for control in standard_list.get("controls", []):
-                text = f"{control['name']} {control['description']}"
-                embedding = model.encode(text, prompt_name=query_prompt_name).tolist()
+                texts.append(f"{control['name']} {control['description']}")
                 flattened_data.append({
                     "process_name": process["process_name"],
                     "control_id": control["id"],
                     "control_name": control["name"],
                     "control_description": control["description"],
-                    "standard_id": control["standard_id"],
-                    "embedding": embedding
+                    "standard_id": control["standard_id"]
                 })
             for risk in standard_list.get("risks", []):
-                text = f"{risk['name']} {risk['description']}"
-                embedding = model.encode(text, prompt_name=query_prompt_name).tolist()
+                texts.append(f"{risk['name']} {risk['description']}")
                 flattened_data.append({
                     "process_name": process["process_name"],
                     "risk_id": risk["id"],
                     "risk_name": risk["name"],
                     "risk_description": risk["description"],
-                    "control_id": risk["control_id"],
-                    "embedding": embedding
+                    "control_id": risk["control_id"]
                 })
 
+    # On GPU encode in-process; on CPU fan batches out over a process pool.
+    # Vectors are cached on disk by (model, text hash), so rebuilds only encode new text.
+    print(f"Using device: {embedding_service.describe()['device']}")
+    embeddings = embedding_service.embed_documents(texts, workers=None)
+
+    for row, embedding in zip(flattened_data, embeddings):
+        row["embedding"] = embedding
+
+    # Optional compact first-pass index; full-precision vectors stay on disk for rescoring.
+    # It carries the row payloads, so iris_test_lance_db searches it without opening the table.
+    # Quantized indexes from earlier builds are removed first: iris_test_lance_db prefers any
+    # index it finds, and one left over from another build would serve stale rows.
+    for mode in MODES:
+        shutil.rmtree(f"./lancedb/rcm_data_{mode}", ignore_errors=True)
+    if quantize:
+        rows = [{key: value for key, value in row.items() if key != "embedding"} for row in flattened_data]
+        index = QuantizedIndex.build(f"./lancedb/rcm_data_{quantize}", [str(i) for i in range(len(embeddings))], embeddings,
+                                     mode=quantize, rows=rows)
+        embedding_service.write_index_tag(f"./lancedb/rcm_data_{quantize}/embedding.json")
+        print(f"Quantized index report: {recall_report(index, recall_queries(embedding_service, embeddings), k=min(10, len(embeddings)))}")
+
     # Create or overwrite the table
     table = await db.create_table("rcm_data", data=flattened_data, mode="overwrite")
+    embedding_service.write_index_tag("./lancedb/rcm_data.embedding.json")
 
     print(f"Table 'rcm_data' created with {len(flattened_data)} rows")
 
@@ -68,4 +98,12 @@ async def initialize_lancedb():
     print("Available tables:", tables)
 
 if __name__ == "__main__":
-    asyncio.run(initialize_lancedb())
+    # Workers of the embedding pool must not inherit CUDA/tokenizer state from the parent
+    import multiprocessing
+    multiprocessing.set_start_method("spawn", force=True)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quantize", choices=["int8", "binary"], help="Also build a quantized first-pass index with full-precision rescoring")
+    args = parser.parse_args()
+
+    asyncio.run(initialize_lancedb(quantize=args.quantize))
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks.synthetic import synthetic_rcm_data, synthetic_bullet_points
+from benchmarks.vector_backends import format_report
+
+# Scaling benchmark for the indexing and UI data paths: initialize_chroma_db, load_rcm_data
+# (JSON, Parquet, single process), the Inventory tab aggregates and graph, and bullet point
+# grouping. Sizes are multiples of the bundled base case. Every (case, scale) runs in its own
+# worker process: one run under tracemalloc for peak Python memory, then timed repeats.
+# Results are compared against data_paths_thresholds.json and the script exits non-zero on a
+# regression beyond the tolerance.
+#
+#   python -m benchmarks.data_paths --scales 1 10 100
+#   python -m benchmarks.data_paths --scales 1 10 --update-thresholds
+
+# Flattened items in streamlit_functions/rcm_output_base.json
+BASE_ITEMS = 490
+BASE_BULLET_POINTS = 200
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_paths_thresholds.json')
+
+# Deterministic vectors derived from the text hash, so the index build is measured without a model
+def _hash_embedding_service():
+    from streamlit_functions.embedding_service import EmbeddingService
+
+    class HashEmbeddingService(EmbeddingService):
+        def _encode(self, texts, prompt_name):
+            vectors = []
+            for text in texts:
+                seed = int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:4], 'little')
+                vector = np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+                vectors.append((vector / np.linalg.norm(vector)).tolist())
+            return vectors
+
+    return HashEmbeddingService()
+
+def _write_json(path: str, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+# Each setup prepares inputs in workdir and returns the function to measure
+def setup_initialize_chroma_db(workdir: str, scale: int, backend: str) -> Callable[[], Any]:
+    from streamlit_functions.generate_rcm import initialize_chroma_db
+    from streamlit_functions import vector_store
+    rcm_data = synthetic_rcm_data(BASE_ITEMS * scale)
+    service = _hash_embedding_service()
+
+    def run():
+        db_path = os.path.join(workdir, f"db_{uuid.uuid4().hex}")
+        initialize_chroma_db(rcm_data, db_path=db_path, backend=backend, embedding_service=service)
+        vector_store.evict(db_path)
+    return run
+
+def _setup_load(workdir: str, scale: int, fmt: str, single_process: bool) -> Callable[[], Any]:
+    from streamlit_functions import data_access
+    from streamlit_functions.rcm_columnar import write_rcm_parquet, parquet_path_for
+    rcm_data = synthetic_rcm_data(BASE_ITEMS * scale)
+    json_path = os.path.join(workdir, 'rcm_output.json')
+    if fmt == 'json':
+        _write_json(json_path, rcm_data)
+    else:
+        write_rcm_parquet(rcm_data, parquet_path_for(json_path))
+    processes = [rcm_data[len(rcm_data) // 2]['process_name']] if single_process else None
+
+    def run():
+        data_access.invalidate()
+        return data_access.load_rcm_data(json_path, processes)
+    return run
+
+def setup_load_rcm_data_json(workdir, scale, backend):
+    return _setup_load(workdir, scale, 'json', False)
+
+def setup_load_rcm_data_parquet(workdir, scale, backend):
+    return _setup_load(workdir, scale, 'parquet', False)
+
+def setup_load_one_process_parquet(workdir, scale, backend):
+    return _setup_load(workdir, scale, 'parquet', True)
+
+def setup_summarize_rcm(workdir, scale, backend):
+    from streamlit_functions.rcm_summary import summarize_rcm
+    rcm_data = synthetic_rcm_data(BASE_ITEMS * scale)
+    return lambda: summarize_rcm(rcm_data)
+
+def setup_load_rcm_summary(workdir, scale, backend):
+    from streamlit_functions import data_access
+    from streamlit_functions.rcm_summary import write_rcm_summary
+    from streamlit_functions.rcm_columnar import write_rcm_parquet, parquet_path_for
+    rcm_data = synthetic_rcm_data(BASE_ITEMS * scale)
+    json_path = os.path.join(workdir, 'rcm_output.json')
+    # Same outputs, in the same order, as generate_rcm
+    _write_json(json_path, rcm_data)
+    try:
+        write_rcm_parquet(rcm_data, parquet_path_for(json_path))
+    except ImportError:
+        pass
+    write_rcm_summary(rcm_data, json_path)
+
+    def run():
+        data_access.invalidate()
+        return data_access.load_rcm_summary(json_path)
+    return run
+
+def setup_inventory_graph(workdir, scale, backend):
+    from streamlit_functions.inventory_search import RCMGraph
+    rcm_data = synthetic_rcm_data(BASE_ITEMS * scale)
+    return lambda: RCMGraph(rcm_data)
+
+def setup_bullet_grouping(workdir, scale, backend):
+    from streamlit_functions.bullet_store import append_bullet_points, load_index, read_topic_page
+    bullet_points = synthetic_bullet_points(BASE_BULLET_POINTS * scale)
+
+    def run():
+        path = os.path.join(workdir, f"bullets_{uuid.uuid4().hex}.jsonl")
+        append_bullet_points(path, bullet_points, 'synthetic.pdf')
+        index = load_index(path)
+        # What the Document Upload tab reads: topic counts plus the first page of every topic
+        for topic in index['topic_counts']:
+            read_topic_page(path, topic, 0, 10, index=index)
+    return run
+
+CASES = {
+    'initialize_chroma_db': setup_initialize_chroma_db,
+    'load_rcm_data_json': setup_load_rcm_data_json,
+    'load_rcm_data_parquet': setup_load_rcm_data_parquet,
+    'load_one_process_parquet': setup_load_one_process_parquet,
+    'summarize_rcm': setup_summarize_rcm,
+    'load_rcm_summary': setup_load_rcm_summary,
+    'inventory_graph': setup_inventory_graph,
+    'bullet_grouping': setup_bullet_grouping
+}
+
+def run_case(case: str, scale: int, repeats: int, backend: str) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix=f"bench_{case}_")
+    cwd = os.getcwd()
+    # Relative artifacts (e.g. the embedding cache) land in the scratch directory
+    os.chdir(workdir)
+    try:
+        run = CASES[case](workdir, scale, backend)
+
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        return {
+            'case': case,
+            'scale': scale,
+            'median_s': round(statistics.median(timings), 4),
+            'min_s': round(min(timings), 4),
+            'peak_mb': round(peak / 2**20, 2)
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def load_thresholds(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {'tolerance': 0.5, 'min_seconds': 0.005, 'min_mb': 1.0, 'cases': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Mark each result against its threshold; returns the regressions
+def check_regressions(results: List[Dict[str, Any]], thresholds: Dict[str, Any]) -> List[Dict[str, Any]]:
+    tolerance = thresholds.get('tolerance', 0.5)
+    # Absolute slack so sub-millisecond cases do not flag on timer noise
+    slack = {'seconds': thresholds.get('min_seconds', 0.005), 'peak_mb': thresholds.get('min_mb', 1.0)}
+    regressions = []
+    for result in results:
+        threshold = thresholds['cases'].get(f"{result['case']}@{result['scale']}")
+        if threshold is None:
+            result['status'] = 'no threshold'
+            continue
+        over = [metric for metric, measured in (('seconds', result['median_s']), ('peak_mb', result['peak_mb']))
+                if measured > threshold[metric] * (1 + tolerance) + slack[metric]]
+        result['status'] = 'REGRESSION: ' + ', '.join(over) if over else 'ok'
+        if over:
+            regressions.append(result)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexing and UI data paths on synthetic inventories")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Multiples of the base case size")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy"], help="Vector backend for initialize_chroma_db")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--update-thresholds", action="store_true", help="Record these results as the new thresholds")
+    parser.add_argument("--output", default="data_paths.json")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        for case in args.cases:
+            print(f"Running {case} at {scale}x...")
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    results.append(executor.submit(run_case, case, scale, args.repeats, args.backend).result())
+                except Exception as e:
+                    print(f"Error benchmarking {case} at {scale}x: {str(e)}")
+
+    thresholds = load_thresholds(args.thresholds)
+    if args.update_thresholds:
+        for result in results:
+            thresholds['cases'][f"{result['case']}@{result['scale']}"] = {'seconds': result['median_s'], 'peak_mb': result['peak_mb']}
+        with open(args.thresholds, 'w') as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+        print(f"Thresholds updated in {args.thresholds}")
+
+    regressions = check_regressions(results, thresholds)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_report(results))
+    print(f"Results saved to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {thresholds.get('tolerance', 0.5):.0%} of the thresholds")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks.synthetic import synthetic_rcm_data
+from benchmarks.vector_backends import rss_mb, format_report
+from streamlit_functions.rcm_items import flatten_rcm, chroma_record
+
+# CPU embedding micro-benchmark: sentence-transformers (PyTorch) against the int8 ONNX
+# embedding function on RCM-shaped texts. Each backend runs in its own worker process so
+# cold start (imports + model load) and RSS are measured from a clean interpreter.
+#
+#   python -m benchmarks.onnx_embedding --texts 2000 --batch-size 32
+
+def sample_texts(n_texts: int, seed: int = 0) -> List[str]:
+    return [chroma_record(item)[0] for item in flatten_rcm(synthetic_rcm_data(n_texts, seed=seed))][:n_texts]
+
+def run_backend(backend: str, texts: List[str], batch_size: int, threads: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if backend == 'torch':
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(threads)
+        model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+        encode = lambda batch: model.encode(batch, batch_size=batch_size, normalize_embeddings=True)
+    else:
+        from streamlit_functions.onnx_embedding import OnnxEmbeddingFunction
+        function = OnnxEmbeddingFunction(batch_size=batch_size, threads=threads)
+        encode = lambda batch: np.asarray(function(batch))
+    cold_start = time.perf_counter() - start
+
+    # Single-query latency, as seen by the search box
+    latencies = []
+    for text in texts[:100]:
+        start = time.perf_counter()
+        encode([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    vectors = encode(texts)
+    seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "texts": len(texts),
+        "cold_start_s": round(cold_start, 2),
+        "texts_per_s": round(len(texts) / seconds, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "rss_mb": round(rss_mb(), 1),
+        "vectors": np.asarray(vectors, dtype=np.float32).tolist()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyTorch vs int8 ONNX embeddings on CPU")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tolerance", type=float, default=0.98, help="Minimum cosine similarity to the PyTorch vectors")
+    parser.add_argument("--output", default="onnx_embedding.json")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts)
+    results = []
+    for backend in ('torch', 'onnx'):
+        print(f"Running {backend} on {len(texts)} texts...")
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(run_backend, backend, texts, args.batch_size, args.threads).result())
+
+    reference, candidate = (np.asarray(result.pop("vectors"), dtype=np.float32) for result in results)
+    similarities = (reference * candidate).sum(axis=1)
+    results[0].update({"min_cosine": 1.0, "mean_cosine": 1.0, "speedup": 1.0})
+    results[1].update({
+        "min_cosine": round(float(similarities.min()), 4),
+        "mean_cosine": round(float(similarities.mean()), 4),
+        "speedup": round(results[1]["texts_per_s"] / results[0]["texts_per_s"], 2)
+    })
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_report(results))
+    if similarities.min() < args.tolerance:
+        print(f"WARNING: min cosine {similarities.min():.4f} is below the {args.tolerance} tolerance")
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Dict, Any
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks.vector_backends import format_report
+
+# Import-time benchmark for the Streamlit app's cold start. Each repeat imports the target in a
+# fresh interpreter under `python -X importtime`, so nothing is cached between runs, and reports
+# the wall-clock import time, the cumulative import time of the slowest top-level modules and any
+# heavy dependency that was loaded at import instead of at first use. streamlit.py cannot be
+# imported by name (it shadows the streamlit package), so script targets are loaded from their
+# path under the module name iris_app.
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --target streamlit_functions.generate_rcm --check
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_TARGET = 'streamlit.py'
+
+# Should be imported on first use or by the warm-up thread, never while the first page renders
+HEAVY_MODULES = ['chromadb', 'openai', 'instructor', 'plotly', 'pandas', 'PyPDF2', 'torch',
+                 'sentence_transformers', 'onnxruntime', 'tqdm', 'pyarrow', 'lancedb']
+
+_LOADER = """
+import importlib.util, json, os, sys, time
+target = sys.argv[1]
+start = time.perf_counter()
+if target.endswith('.py'):
+    spec = importlib.util.spec_from_file_location('iris_app', target)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['iris_app'] = module
+    spec.loader.exec_module(module)
+else:
+    importlib.import_module(target)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+# `import time: self [us] | cumulative | imported package`, nesting shown by indentation
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+    return entries
+
+def measure(target: str) -> Dict[str, Any]:
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', _LOADER, target],
+                               cwd=REPO_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold import cost of the Streamlit app")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="Script path or module name to import")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to report")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a heavy dependency is imported")
+    parser.add_argument("--output", default="startup.json")
+    args = parser.parse_args()
+
+    runs = [measure(args.target) for _ in range(args.repeats)]
+    imports = runs[-1]['imports']
+    loaded = set(runs[-1]['modules'])
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+
+    top_level = sorted((entry for entry in imports if entry['depth'] == 0), key=lambda entry: entry['cumulative_ms'], reverse=True)
+    report = {
+        'target': args.target,
+        'median_s': round(statistics.median(run['seconds'] for run in runs), 3),
+        'min_s': round(min(run['seconds'] for run in runs), 3),
+        'modules_loaded': len(loaded),
+        'heavy_modules': heavy,
+        'top_imports': [{'module': entry['module'], 'cumulative_ms': round(entry['cumulative_ms'], 1)} for entry in top_level[:args.top]]
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{args.target}: median {report['median_s']}s, min {report['min_s']}s over {args.repeats} cold imports, {len(loaded)} modules")
+    print(format_report(report['top_imports']))
+    print(f"Heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+    print(f"Results saved to {args.output}")
+    if args.check and heavy:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
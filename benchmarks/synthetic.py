@@ -0,0 +1,102 @@
+import random
+from typing import List, Dict, Any
+import numpy as np
+
+# Items produced per synthetic process: 1 process, 2 standards, 4 requirements, 3 controls, 3 risks
+ITEMS_PER_PROCESS = 13
+
+WORDS = [
+    "access", "vendor", "payment", "change", "incident", "backup", "recovery", "encryption",
+    "identity", "network", "patch", "audit", "privacy", "retention", "fraud", "liquidity",
+    "capacity", "release", "monitoring", "onboarding", "reconciliation", "segregation", "logging",
+    "configuration", "continuity", "third-party", "credential", "approval", "review", "escalation"
+]
+
+def _phrase(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+# Generate a list of BodyRCMs-shaped dicts with enough processes for roughly n_items flattened items
+def synthetic_rcm_data(n_items: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    n_processes = max(1, -(-n_items // ITEMS_PER_PROCESS))
+    rcm_data = []
+    for process_index in range(n_processes):
+        standards = []
+        for standard_index in range(2):
+            standards.append({
+                "id": f"STD-{standard_index + 1:04d}",
+                "name": f"{_phrase(rng, 2).title()} Standard",
+                "description": _phrase(rng, 30),
+                "requirements": [
+                    {
+                        "id": f"REQ-{standard_index * 2 + req_index + 1:04d}",
+                        "name": _phrase(rng, 3).title(),
+                        "description": _phrase(rng, 40)
+                    }
+                    for req_index in range(2)
+                ]
+            })
+        controls = [
+            {
+                "id": f"CTRL-{control_index + 1:04d}",
+                "name": _phrase(rng, 3).title(),
+                "description": _phrase(rng, 40),
+                "standard_id": standards[control_index % 2]["id"]
+            }
+            for control_index in range(3)
+        ]
+        risks = [
+            {
+                "id": f"RSK-{risk_index + 1:04d}",
+                "name": _phrase(rng, 2).title(),
+                "description": _phrase(rng, 40),
+                "control_id": controls[risk_index]["id"]
+            }
+            for risk_index in range(3)
+        ]
+        rcm_data.append({
+            "process_name": f"{_phrase(rng, 2).title()} Process {process_index}",
+            "list_standards": [{"standard": standards, "controls": controls, "risks": risks}]
+        })
+    return rcm_data
+
+# Generate ListBulletPoints-shaped dicts (the `list_bullet_points` items) spread over n_pages
+# pages. Topic popularity is skewed like real documents: a few topics hold most bullet points.
+def synthetic_bullet_points(n_bullet_points: int, n_topics: int = 40, n_pages: int = 300, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    topics = [f"{_phrase(rng, 2).title()} {topic_index}" for topic_index in range(n_topics)]
+    weights = [1 / (rank + 1) for rank in range(n_topics)]
+    bullet_points = []
+    for index in range(n_bullet_points):
+        bullet_points.append({
+            "name": f"{_phrase(rng, 3).title()} {index}",
+            "topics": list(dict.fromkeys(rng.choices(topics, weights=weights, k=rng.randint(1, 3)))),
+            "text": _phrase(rng, 100),
+            "description": _phrase(rng, 30),
+            "context": _phrase(rng, 20),
+            "pagenum": str(index * n_pages // max(1, n_bullet_points) + 1)
+        })
+    return bullet_points
+
+# Unit-norm embeddings clustered by process, so nearest neighbours are not uniformly random
+def synthetic_embeddings(n_items: int, dim: int = 384, n_clusters: int = 256, noise: float = 0.5, seed: int = 0,
+                         chunk_size: int = 100_000) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = np.empty((n_items, dim), dtype=np.float32)
+    for start in range(0, n_items, chunk_size):
+        end = min(start + chunk_size, n_items)
+        clusters = (np.arange(start, end) // ITEMS_PER_PROCESS) % n_clusters
+        chunk = centers[clusters] + noise * rng.standard_normal((end - start, dim)).astype(np.float32) / np.sqrt(dim)
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+        vectors[start:end] = chunk
+    return vectors
+
+# Queries are perturbed copies of random corpus vectors
+def synthetic_queries(vectors: np.ndarray, n_queries: int, noise: float = 0.3, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(vectors), n_queries)
+    queries = vectors[picks] + noise * rng.standard_normal((n_queries, vectors.shape[1])).astype(np.float32) / np.sqrt(vectors.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries.astype(np.float32)
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmarks.synthetic import synthetic_rcm_data, synthetic_embeddings, synthetic_queries
+from streamlit_functions.rcm_items import flatten_rcm
+
+# Recall/latency benchmark for the vector stores we prototype against: Chroma HNSW, LanceDB IVF-PQ
+# and exact numpy brute force. Each (backend, size) run happens in its own worker process so build
+# time, RSS and on-disk size are not polluted by earlier runs.
+#
+#   python -m benchmarks.vector_backends --sizes 10000 100000 1000000 --output vector_backends.json
+
+def rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        # ru_maxrss is in KiB on Linux; it is a peak, not a current value
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total / 2**20
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, chunk_size: int = 256) -> np.ndarray:
+    results = []
+    for start in range(0, len(queries), chunk_size):
+        scores = queries[start:start + chunk_size] @ vectors.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        results.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(results)
+
+class BruteForceBackend:
+    name = "bruteforce"
+
+    def build(self, ids: List[str], vectors: np.ndarray, workdir: str):
+        self.ids = np.array(ids)
+        np.save(os.path.join(workdir, "vectors.npy"), vectors)
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> List[str]:
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, k)[:k]
+        return list(self.ids[top[np.argsort(-scores[top])]])
+
+class ChromaBackend:
+    name = "chroma-hnsw"
+
+    def build(self, ids: List[str], vectors: np.ndarray, workdir: str):
+        import chromadb
+        client = chromadb.PersistentClient(path=workdir)
+        self.collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        batch_size = getattr(client, "max_batch_size", None) or 5000
+        for start in range(0, len(ids), batch_size):
+            self.collection.add(ids=ids[start:start + batch_size], embeddings=vectors[start:start + batch_size].tolist())
+
+    def search(self, query: np.ndarray, k: int) -> List[str]:
+        return self.collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])['ids'][0]
+
+class LanceIVFPQBackend:
+    name = "lancedb-ivfpq"
+
+    def __init__(self, nprobes: int = 20, refine_factor: int = 10):
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
+
+    def build(self, ids: List[str], vectors: np.ndarray, workdir: str):
+        import lancedb
+        import pyarrow as pa
+        db = lancedb.connect(workdir)
+        dim = vectors.shape[1]
+        data = pa.table({
+            "id": pa.array(ids),
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), dim)
+        })
+        self.table = db.create_table("bench", data=data, mode="overwrite")
+        # IVF-PQ needs a few hundred rows per partition to train; tiny corpora fall back to flat search
+        if len(ids) >= 10_000:
+            self.table.create_index(metric="cosine", num_partitions=max(16, int(np.sqrt(len(ids)))),
+                                    num_sub_vectors=dim // 8)
+
+    def search(self, query: np.ndarray, k: int) -> List[str]:
+        return [row["id"] for row in self.table.search(query).metric("cosine").nprobes(self.nprobes)
+                .refine_factor(self.refine_factor).limit(k).select(["id"]).to_list()]
+
+class NumpyStoreBackend:
+    name = "numpy-mmap"
+    quantize = None
+
+    def build(self, ids: List[str], vectors: np.ndarray, workdir: str):
+        from streamlit_functions.numpy_store import NumpyVectorClient
+        self.collection = NumpyVectorClient(workdir).get_or_create_collection("bench")
+        self.collection.quantize = self.quantize
+        self.collection.add(ids=ids, embeddings=vectors)
+
+    def search(self, query: np.ndarray, k: int) -> List[str]:
+        return self.collection.query(query_embeddings=[query], n_results=k, include=[])['ids'][0]
+
+class NumpyStoreInt8Backend(NumpyStoreBackend):
+    name = "numpy-mmap-int8"
+    quantize = "int8"
+
+class QuantizedBackend:
+    mode = None
+
+    def build(self, ids: List[str], vectors: np.ndarray, workdir: str):
+        from streamlit_functions.quantized_index import QuantizedIndex
+        self.index = QuantizedIndex.build(workdir, ids, vectors, mode=self.mode)
+
+    def search(self, query: np.ndarray, k: int) -> List[str]:
+        return [hit['id'] for hit in self.index.search(query, k)[0]]
+
+class Int8RescoreBackend(QuantizedBackend):
+    name = "int8-rescore"
+    mode = "int8"
+
+class BinaryRescoreBackend(QuantizedBackend):
+    name = "binary-rescore"
+    mode = "binary"
+
+BACKENDS = {
+    BruteForceBackend.name: BruteForceBackend,
+    NumpyStoreBackend.name: NumpyStoreBackend,
+    NumpyStoreInt8Backend.name: NumpyStoreInt8Backend,
+    Int8RescoreBackend.name: Int8RescoreBackend,
+    BinaryRescoreBackend.name: BinaryRescoreBackend,
+    ChromaBackend.name: ChromaBackend,
+    LanceIVFPQBackend.name: LanceIVFPQBackend
+}
+
+def run_backend(backend_name: str, size: int, dim: int, n_queries: int, k: int, seed: int) -> Dict[str, Any]:
+    ids = [item['id'] for item in flatten_rcm(synthetic_rcm_data(size, seed=seed))][:size]
+    vectors = synthetic_embeddings(len(ids), dim=dim, seed=seed)
+    queries = synthetic_queries(vectors, n_queries, seed=seed + 1)
+    truth = exact_top_k(vectors, queries, k)
+    truth_ids = [{ids[i] for i in row} for row in truth]
+
+    backend = BACKENDS[backend_name]()
+    workdir = tempfile.mkdtemp(prefix=f"bench_{backend_name}_")
+    try:
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        backend.build(ids, vectors, workdir)
+        build_seconds = time.perf_counter() - start
+        rss_after = rss_mb()
+
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth_ids):
+            start = time.perf_counter()
+            found = backend.search(query, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected.intersection(found))
+
+        return {
+            "backend": backend_name,
+            "size": len(ids),
+            "dim": dim,
+            "k": k,
+            "build_seconds": round(build_seconds, 3),
+            "disk_mb": round(dir_size_mb(workdir), 2),
+            "rss_mb": round(rss_after, 1),
+            "rss_delta_mb": round(rss_after - rss_before, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            f"recall@{k}": round(hits / (k * len(queries)), 4)
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    if not results:
+        return "No results."
+    columns = list(results[0].keys())
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for result in results:
+        lines.append("| " + " | ".join(str(result.get(column, "")) for column in columns) + " |")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector backends on synthetic RCM corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="vector_backends.json")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for backend_name in args.backends:
+            print(f"Running {backend_name} at {size} items...")
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    result = executor.submit(run_backend, backend_name, size, args.dim, args.queries, args.k, args.seed).result()
+                except Exception as e:
+                    print(f"Error benchmarking {backend_name} at {size} items: {str(e)}")
+                    result = {"backend": backend_name, "size": size, "error": str(e)}
+            results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(format_report([result for result in results if "error" not in result]))
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,80 @@
 import streamlit as st
-from streamlit_functions.generate_rcm import main as generate_rcm_async
-from streamlit_functions.ingest_document import main as process_document
-import json
+from streamlit_functions.inventory_search import search_inventory
+from streamlit_functions.embedding_service import get_embedding_service
+from streamlit_functions import vector_store
+from streamlit_functions import data_access
+from streamlit_functions.bullet_store import BULLET_POINTS_JSONL, convert_json_to_jsonl, read_topic_page
+from streamlit_functions.llm_telemetry import stage_metrics
+from streamlit_functions.llm_client import limiter_stats
+from streamlit_functions.warmup import start_warmup, warmup_status
 import asyncio
 import os
-import plotly.graph_objects as go
-import openai
-import pandas as pd
-import PyPDF2
-from streamlit_pdf_viewer import pdf_viewer
-from PyPDF2 import PdfWriter
-
-# Set up OpenAI API key
-openai.api_key = os.getenv("open_ai")
-
-async def generate_rcm(business_description):
-    return await generate_rcm_async(business_description)
-
-def load_rcm_data(file_name='rcm_output.json'):
-    file_path = os.path.join('streamlit_functions', file_name)
-    with open(file_path, 'r') as f:
-        return json.load(f)
-    
+
+# Heavy dependencies (plotly, pandas, PyPDF2, openai and the generation pipelines with chromadb
+# and instructor) are imported where they are first used, and preloaded by the warm-up thread
+# started after the first render. benchmarks/startup.py checks the import cost.
+
+async def generate_rcm(business_description, on_partial=None, incremental=True):
+    from streamlit_functions.generate_rcm import main as generate_rcm_async
+    return await generate_rcm_async(business_description, on_partial=on_partial, incremental=incremental, reuse=incremental)
+
+# RCMs are streamed: each process gets a live block listing its standards, controls and risks as
+# soon as they are settled, instead of waiting for every full completion
+def stream_rcm_generation(business_description, incremental=True):
+    from streamlit_functions.generate_rcm import settled_rcm_items
+    live = st.container()
+    placeholders = {}
+    shown = {}
+
+    def show_partial(process_name, rcm, done):
+        settled = settled_rcm_items(rcm.dict(), done)
+        counts = (done,) + tuple(len(items) for items in settled.values())
+        # Partials arrive per token; redraw only when an element settles
+        if shown.get(process_name) == counts:
+            return
+        shown[process_name] = counts
+        if process_name not in placeholders:
+            placeholders[process_name] = live.empty()
+        with placeholders[process_name].container():
+            status = "done" if done else "generating..."
+            st.markdown(f"**{process_name}** ({status}): {len(settled['standards'])} standards, "
+                        f"{len(settled['controls'])} controls, {len(settled['risks'])} risks")
+            for key, label in (('standards', 'Standard'), ('controls', 'Control'), ('risks', 'Risk')):
+                for item in settled[key]:
+                    st.write(f"- {label}: **{item['name']}**")
+
+    asyncio.run(generate_rcm(business_description, on_partial=show_partial, incremental=incremental))
+
+# Parsed artifacts come from the process-wide data access cache and are shared across sessions;
+# `processes` limits the load to the named processes
+def load_rcm_data(file_name='rcm_output.json', processes=None):
+    return data_access.load_rcm_data(os.path.join('streamlit_functions', file_name), processes)
+
+def load_rcm_summary(file_name='rcm_output.json'):
+    return data_access.load_rcm_summary(os.path.join('streamlit_functions', file_name))
+
+# One grouped bar chart for all processes, rebuilt only when the summary changes
+@st.cache_resource(max_entries=4)
+def get_overview_chart(rcm_file, summary):
+    import plotly.graph_objects as go
+    process_names = [process['process_name'] for process in summary['processes']]
+    fig = go.Figure(data=[
+        go.Bar(name='Risks', x=process_names, y=[process['risks'] for process in summary['processes']]),
+        go.Bar(name='Controls', x=process_names, y=[process['controls'] for process in summary['processes']]),
+        go.Bar(name='Standards', x=process_names, y=[process['standards'] for process in summary['processes']])
+    ])
+    fig.update_layout(title='Inventory Overview', barmode='group')
+    return fig
+
+# Collection handles come from the process-wide vector store pool, shared across sessions
+def get_inventory_collections(db_path="./chroma_db"):
+    if not os.path.isdir(db_path):
+        return None
+    return vector_store.get_rcm_collections(db_path, get_embedding_service())
+
 def generate_random_business_topic():
+    import openai
+    openai.api_key = os.getenv("open_ai")
     response = openai.chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[
@@ -37,12 +89,23 @@ def main():
 
     # Sidebar
     st.sidebar.title("Navigation")
-    tab = st.sidebar.radio("Select a tab:", ["Inventory", "Document Upload"])
+    tab = st.sidebar.radio("Select a tab:", ["Inventory", "Document Upload", "LLM Metrics"])
+
+    with st.sidebar.expander("Vector store health"):
+        st.json(vector_store.pool_health())
+
+    with st.sidebar.expander("Warm-up"):
+        st.json(warmup_status())
 
     if tab == "Inventory":
         inventory_tab()
-    else:
+    elif tab == "Document Upload":
         document_upload_tab()
+    else:
+        llm_metrics_tab()
+
+    # The page is rendered; preload the rest of the app in the background
+    start_warmup()
 
 def inventory_tab():
     # Initialize session state for business description
@@ -59,65 +122,144 @@ def inventory_tab():
             st.rerun()
 
     with col2:
-        if st.button("Generate Processes and Controls"):
-            if business_description:
-                asyncio.run(generate_rcm(business_description))
-                st.success("Processes and controls generated successfully!")
-            else:
-                st.warning("Please provide a business description.")
+        generate_clicked = st.button("Generate Processes and Controls")
+        # Unchecked, only processes that are new or changed since the last run are regenerated, and
+        # those similar to a process generated before reuse its RCM from the library
+        regenerate_all = st.checkbox("Regenerate all processes", value=False)
 
     with col3:
         if st.button("Use Financial Institution Case"):
-            st.session_state.rcm_data = load_rcm_data('rcm_output_base.json')
+            st.session_state.rcm_file = 'rcm_output_base.json'
             st.success("Loaded financial institution case successfully!")
 
+    if generate_clicked:
+        if business_description:
+            stream_rcm_generation(business_description, incremental=not regenerate_all)
+            st.success("Processes and controls generated successfully!")
+        else:
+            st.warning("Please provide a business description.")
+
     # Display generated processes and controls
-    rcm_data = st.session_state.get('rcm_data') or load_rcm_data()
-    if rcm_data:
+    rcm_file = st.session_state.get('rcm_file', 'rcm_output.json')
+    summary = load_rcm_summary(rcm_file)
+    if summary['processes']:
+        inventory_search_section(rcm_file)
+
         st.subheader("Generated Processes:")
+        st.plotly_chart(get_overview_chart(rcm_file, summary), key="chart_overview")
+
+        # Only the selected process is loaded and rendered
+        process_names = [process['process_name'] for process in summary['processes']]
+        i = st.selectbox("Process", range(len(process_names)), format_func=lambda index: process_names[index])
+        process = load_rcm_data(rcm_file, processes=[process_names[i]])[process_names[:i].count(process_names[i])]
+
+        st.header(process['process_name'])
+        
+        # Counts precomputed when the RCM output was written
+        counts = summary['processes'][i]
+        total_risks = counts['risks']
+        total_controls = counts['controls']
+        total_standards = counts['standards']
         
-        # Create tabs for each process
-        tabs = st.tabs([process['process_name'] for process in rcm_data])
+        # Create charts
+        import plotly.graph_objects as go
+        fig = go.Figure(data=[
+            go.Bar(name='Risks', x=['Risks'], y=[total_risks]),
+            go.Bar(name='Controls', x=['Controls'], y=[total_controls]),
+            go.Bar(name='Standards', x=['Standards'], y=[total_standards])
+        ])
+        fig.update_layout(title='Process Overview', barmode='group')
+        st.plotly_chart(fig, key="chart_process")
+
+        for standard_group in process['list_standards']:
+            for standard in standard_group['standard']:
+                with st.expander(f"Standard: {standard['id']}"):
+                    st.write(f"**Name:** {standard['name']}")
+                    st.write(f"**Description:** {standard['description']}")
+                    
+                    st.subheader("Requirements")
+                    for req in standard['requirements']:
+                        st.write(f"- **{req['name']}:** {req['description']}")
 
-        for i, process in enumerate(rcm_data):
-            with tabs[i]:
-                st.header(process['process_name'])
-                
-                # Count risks, controls, and standards
-                total_risks = sum(len(standard_group['risks']) for standard_group in process['list_standards'])
-                total_controls = sum(len(standard_group['controls']) for standard_group in process['list_standards'])
-                total_standards = sum(len(standard_group['standard']) for standard_group in process['list_standards'])
-                
-                # Create charts
-                fig = go.Figure(data=[
-                    go.Bar(name='Risks', x=['Risks'], y=[total_risks]),
-                    go.Bar(name='Controls', x=['Controls'], y=[total_controls]),
-                    go.Bar(name='Standards', x=['Standards'], y=[total_standards])
-                ])
-                fig.update_layout(title='Process Overview', barmode='group')
-                st.plotly_chart(fig, key=f"chart_{process['process_name']}")
-
-                for standard_group in process['list_standards']:
-                    for standard in standard_group['standard']:
-                        with st.expander(f"Standard: {standard['id']}"):
-                            st.write(f"**Name:** {standard['name']}")
-                            st.write(f"**Description:** {standard['description']}")
-                            
-                            st.subheader("Requirements")
-                            for req in standard['requirements']:
-                                st.write(f"- **{req['name']}:** {req['description']}")
-
-                    st.subheader("Controls")
-                    for control in standard_group['controls']:
-                        st.write(f"- **{control['name']}:** {control['description']}")
-
-                    st.subheader("Risks")
-                    for risk in standard_group['risks']:
-                        st.write(f"- **{risk['name']}:** {risk['description']}")
+            st.subheader("Controls")
+            for control in standard_group['controls']:
+                st.write(f"- **{control['name']}:** {control['description']}")
+
+            st.subheader("Risks")
+            for risk in standard_group['risks']:
+                st.write(f"- **{risk['name']}:** {risk['description']}")
 
     st.divider()
 
+def inventory_search_section(rcm_file):
+    query = st.text_input("Search inventory:")
+    if not query:
+        return
+
+    graph = data_access.load_inventory_graph(os.path.join('streamlit_functions', rcm_file))
+    results = search_inventory(query, graph, get_inventory_collections(), embedding_service=get_embedding_service())
+    if not results:
+        st.info("No matching risks, controls or standards found.")
+    for result in results:
+        with st.expander(f"{result['type']}: {result['name']} ({result['process']})"):
+            st.write("**Related items:**")
+            for related in result['related_items']:
+                st.write(f"- {related}")
+
+# Per-stage view of the LLM call log written by streamlit_functions/llm_telemetry.py
+def llm_metrics_tab():
+    import pandas as pd
+    import plotly.graph_objects as go
+    st.header("LLM Metrics")
+    calls = data_access.load_llm_calls()
+    if not calls:
+        st.info("No LLM calls recorded yet. Calls are logged when RCMs are generated or documents are analyzed.")
+        return
+
+    metrics = stage_metrics(calls)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Calls", len(calls))
+    col2.metric("Tokens", sum(stage['prompt_tokens'] + stage['completion_tokens'] for stage in metrics))
+    col3.metric("Estimated cost", f"${sum(stage['cost_usd'] for stage in metrics):.2f}")
+
+    st.dataframe(pd.DataFrame(metrics))
+
+    stages = [stage['stage'] for stage in metrics]
+    fig = go.Figure(data=[
+        go.Bar(name='p50', x=stages, y=[stage['p50_ms'] for stage in metrics]),
+        go.Bar(name='p95', x=stages, y=[stage['p95_ms'] for stage in metrics])
+    ])
+    fig.update_layout(title='Latency per Stage (ms)', barmode='group')
+    st.plotly_chart(fig)
+
+    with st.expander("Rate limiter"):
+        limiters = limiter_stats()
+        if limiters:
+            st.dataframe(pd.DataFrame(list(limiters.values())))
+        else:
+            st.write("No requests sent from this server process yet.")
+
+    with st.expander("RCM reuse library"):
+        from streamlit_functions.rcm_library import library_stats
+        library = library_stats()
+        if library:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hit rate", f"{library['hit_rate']:.0%}" if library['hit_rate'] is not None else "-")
+            col2.metric("Calls saved", library['hits'])
+            col3.metric("Library entries", library['entries'])
+            st.json(library)
+        else:
+            st.write("No RCMs generated from this server process yet.")
+
+    with st.expander("Recent calls"):
+        st.dataframe(pd.DataFrame(calls[-50:][::-1]))
+
 def document_upload_tab():
+    import pandas as pd
+    import plotly.graph_objects as go
+    import PyPDF2
+    from PyPDF2 import PdfWriter
+    from streamlit_pdf_viewer import pdf_viewer
     st.header("Document Upload")
 
     # Initialize session state for processing status and PDF viewing
@@ -171,6 +313,7 @@ def document_upload_tab():
                         temp_file_path = os.path.join("./streamlit_functions/manual_docs", file_to_process)
                         
                         # Process the document
+                        from streamlit_functions.ingest_document import main as process_document
                         asyncio.run(process_document(temp_file_path))
                         
                         st.session_state.processing_complete = True
@@ -232,44 +375,47 @@ def document_upload_tab():
     if st.session_state.processing_complete:
         st.subheader("Extracted Bullet Points")
         
-        try:
-            with open('bullet_points.json', 'r') as f:
-                bullet_points_data = json.load(f)
-            
-            # Group bullet points by topics
-            grouped_bullet_points = {}
-            for bullet_point in bullet_points_data['list_bullet_points']:
-                for topic in bullet_point['topics']:
-                    if topic not in grouped_bullet_points:
-                        grouped_bullet_points[topic] = []
-                    grouped_bullet_points[topic].append(bullet_point)
-
-            # Calculate topic counts
-            topic_counts = {topic: len(bullet_points) for topic, bullet_points in grouped_bullet_points.items()}
-
-            # Add a slider for filtering topics
-            min_bullet_points = st.slider("Minimum number of bullet points per topic", 1, max(topic_counts.values()), 1)
-
-            # Filter topics based on the slider value
-            filtered_topics = {topic: count for topic, count in topic_counts.items() if count >= min_bullet_points}
-
-            # Update the bar chart to use filtered topics
-            fig = go.Figure(data=[go.Bar(x=list(filtered_topics.keys()), y=list(filtered_topics.values()))])
-            fig.update_layout(title='Topics and Number of Bullet Points', xaxis_title='Topics', yaxis_title='Number of Bullet Points')
-            st.plotly_chart(fig)
-
-            # Display grouped bullet points (filtered)
-            for topic, bullet_points in grouped_bullet_points.items():
-                if len(bullet_points) >= min_bullet_points:
-                    with st.expander(f"Topic: {topic} ({len(bullet_points)} bullet points)"):
-                        for bullet_point in bullet_points:
-                            st.markdown(f"**{bullet_point['name']}** (Page {bullet_point['pagenum']})")
-                            st.write(f"**Text:** {bullet_point['text']}")
-                            st.write(f"**Description:** {bullet_point['description']}")
-                            st.write(f"**Context:** {bullet_point['context']}")
-                            st.divider()
-        except FileNotFoundError:
-            st.error("bullet_points.json file not found. Please ensure the document was processed correctly.")
+        bullet_points_path = BULLET_POINTS_JSONL
+        # Migrate a legacy bullet_points.json once so the page below only reads byte ranges
+        if not os.path.exists(bullet_points_path) and os.path.exists('bullet_points.json'):
+            convert_json_to_jsonl('bullet_points.json', bullet_points_path)
+
+        if not os.path.exists(bullet_points_path):
+            st.error(f"{bullet_points_path} file not found. Please ensure the document was processed correctly.")
+            return
+
+        bullet_points_index = data_access.load_bullet_point_index(bullet_points_path)
+        topic_counts = bullet_points_index['topic_counts']
+        if not topic_counts:
+            st.info("No bullet points extracted yet.")
+            return
+
+        st.caption(f"{bullet_points_index['count']} bullet points across {len(bullet_points_index['page_counts'])} pages and {len(topic_counts)} topics")
+
+        # Add a slider for filtering topics
+        min_bullet_points = st.slider("Minimum number of bullet points per topic", 1, max(topic_counts.values()), 1)
+
+        # Filter topics based on the slider value
+        filtered_topics = {topic: count for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True) if count >= min_bullet_points}
+
+        # Update the bar chart to use filtered topics
+        fig = go.Figure(data=[go.Bar(x=list(filtered_topics.keys()), y=list(filtered_topics.values()))])
+        fig.update_layout(title='Topics and Number of Bullet Points', xaxis_title='Topics', yaxis_title='Number of Bullet Points')
+        st.plotly_chart(fig)
+
+        # Page through one topic at a time instead of rendering every topic's bullet points
+        topic = st.selectbox("Topic", list(filtered_topics.keys()), format_func=lambda t: f"{t} ({filtered_topics[t]} bullet points)")
+        page_size = 10
+        total_pages = max(1, -(-filtered_topics[topic] // page_size))
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1) if total_pages > 1 else 1
+
+        for bullet_point in read_topic_page(bullet_points_path, topic, page - 1, page_size, index=bullet_points_index):
+            st.markdown(f"**{bullet_point['name']}** (Page {bullet_point['pagenum']})")
+            st.write(f"**Text:** {bullet_point['text']}")
+            st.write(f"**Description:** {bullet_point['description']}")
+            st.write(f"**Context:** {bullet_point['context']}")
+            st.divider()
+        st.write(f"Showing page {page} of {total_pages}")
 
 # Run the Streamlit app
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import json
+import os
+from typing import List, Dict, Any, Optional
+
+# Bullet points are stored one per line in a JSONL file with a small sidecar index
+# (<file>.idx.json) mapping each topic to the byte ranges of its bullet points.
+# Readers page through a single topic by seeking to those ranges, so memory and
+# render cost do not grow with the number of ingested documents.
+
+BULLET_POINTS_JSONL = 'bullet_points.jsonl'
+
+def index_path_for(path: str) -> str:
+    return f"{path}.idx.json"
+
+# topic_counts (topic histogram) and page_counts (bullet points per source page) are
+# maintained as lines are appended, so dashboards never recount the ranges
+def _empty_index():
+    return {'count': 0, 'documents': {}, 'topics': {}, 'topic_counts': {}, 'page_counts': {}}
+
+def load_index(path: str) -> Dict[str, Any]:
+    index_path = index_path_for(path)
+    if not os.path.exists(index_path):
+        return _empty_index()
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    if 'topic_counts' not in index:
+        index['topic_counts'] = {topic: len(ranges) for topic, ranges in index['topics'].items()}
+    index.setdefault('page_counts', {})
+    return index
+
+def _save_index(path: str, index: Dict[str, Any]):
+    tmp_path = f"{index_path_for(path)}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path_for(path))
+
+def _index_line(index: Dict[str, Any], bullet_point: Dict[str, Any], offset: int, length: int):
+    index['count'] += 1
+    document = bullet_point.get('document', '')
+    index['documents'][document] = index['documents'].get(document, 0) + 1
+    page = str(bullet_point.get('pagenum', ''))
+    index['page_counts'][page] = index['page_counts'].get(page, 0) + 1
+    for topic in bullet_point['topics']:
+        index['topics'].setdefault(topic, []).append([offset, length])
+        index['topic_counts'][topic] = index['topic_counts'].get(topic, 0) + 1
+
+def _encode(bullet_point: Dict[str, Any]) -> bytes:
+    return (json.dumps(bullet_point) + "\n").encode('utf-8')
+
+# Append a document's bullet points. With replace=True, bullet points previously ingested
+# from the same document are removed first; pass replace=False to append page by page.
+def append_bullet_points(path: str, bullet_points: List[Dict[str, Any]], document: str = '', replace: bool = True):
+    index = load_index(path)
+    if replace and document in index['documents']:
+        remove_document(path, document)
+        index = load_index(path)
+
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        for bullet_point in bullet_points:
+            bullet_point = dict(bullet_point, document=document)
+            line = _encode(bullet_point)
+            f.write(line)
+            _index_line(index, bullet_point, offset, len(line))
+            offset += len(line)
+    _save_index(path, index)
+
+# Stream-rewrite the JSONL file without one document's bullet points and rebuild the index
+def remove_document(path: str, document: str):
+    if not os.path.exists(path):
+        return
+    index = _empty_index()
+    tmp_path = f"{path}.tmp"
+    with open(path, 'rb') as source, open(tmp_path, 'wb') as target:
+        offset = 0
+        for line in source:
+            bullet_point = json.loads(line)
+            if bullet_point.get('document', '') == document:
+                continue
+            target.write(line)
+            _index_line(index, bullet_point, offset, len(line))
+            offset += len(line)
+    os.replace(tmp_path, path)
+    _save_index(path, index)
+
+# One-off migration of a legacy bullet_points.json ({"list_bullet_points": [...]})
+def convert_json_to_jsonl(json_path: str, path: str, document: str = ''):
+    with open(json_path, 'r') as f:
+        bullet_points = json.load(f)['list_bullet_points']
+    append_bullet_points(path, bullet_points, document)
+
+def topic_counts(path: str) -> Dict[str, int]:
+    return load_index(path)['topic_counts']
+
+# Read one page of a topic's bullet points, touching only their byte ranges
+def read_topic_page(path: str, topic: str, page: int = 0, page_size: int = 10,
+                    index: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    index = index or load_index(path)
+    ranges = index['topics'].get(topic, [])[page * page_size:(page + 1) * page_size]
+    bullet_points = []
+    with open(path, 'rb') as f:
+        for offset, length in ranges:
+            f.seek(offset)
+            bullet_points.append(json.loads(f.read(length)))
+    return bullet_points
+
+def iter_bullet_points(path: str):
+    with open(path, 'rb') as f:
+        for line in f:
+            yield json.loads(line)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Callable
+from streamlit_functions.rcm_columnar import load_rcm_parquet, parquet_path_for
+from streamlit_functions.inventory_search import RCMGraph
+from streamlit_functions.rcm_summary import summarize_rcm, summary_path_for
+from streamlit_functions.bullet_store import index_path_for, load_index as load_bullet_points_index
+from streamlit_functions.llm_telemetry import TELEMETRY_PATH, load_calls
+
+# Process-wide cache of parsed app artifacts (rcm_output*.json / .parquet, the bullet point
+# index, gap analysis rubrics and results, LLM telemetry). Entries are keyed by path plus loader arguments and validated
+# against the file's mtime and size on every access, or against a content hash with
+# validate='hash', so files rewritten by a background run are picked up on the next read.
+#
+# Cached objects are shared by every Streamlit session in the process without copying:
+# callers must treat them as read-only.
+
+_cache: Dict[Any, Dict[str, Any]] = {}
+_lock = threading.Lock()
+stats = {'hits': 0, 'loads': 0}
+
+def _signature(path: str, validate: str):
+    stat = os.stat(path)
+    if validate == 'hash':
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_artifact(path: str, loader: Callable[[str], Any], key: Any = None, validate: str = 'mtime'):
+    cache_key = (os.path.abspath(path), key)
+    signature = _signature(path, validate)
+    with _lock:
+        entry = _cache.get(cache_key)
+        if entry is not None and entry['signature'] == signature:
+            stats['hits'] += 1
+            return entry['value']
+
+    value = loader(path)
+    with _lock:
+        stats['loads'] += 1
+        _cache[cache_key] = {'signature': signature, 'value': value}
+    return value
+
+def invalidate(path: Optional[str] = None):
+    with _lock:
+        if path is None:
+            _cache.clear()
+            return
+        path = os.path.abspath(path)
+        for cache_key in [cache_key for cache_key in _cache if cache_key[0] == path]:
+            del _cache[cache_key]
+
+def _load_json(path: str):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# RCM output. A load limited to `processes` reads only those processes' rows from the Parquet
+# copy when it is at least as fresh as the JSON. A full load parses the JSON (once per version),
+# which is faster than rebuilding every nested record from Parquet; the Parquet copy is used
+# only when there is no JSON. Without a fresh Parquet copy the JSON is filtered in memory.
+def load_rcm_data(file_path: str, processes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parquet_path = parquet_path_for(file_path)
+    has_json = os.path.exists(file_path)
+    if os.path.exists(parquet_path) and (not has_json or (processes is not None and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path))):
+        key = ('rcm', tuple(processes) if processes is not None else None)
+        return get_artifact(parquet_path, lambda path: load_rcm_parquet(path, processes), key)
+
+    rcm_data = get_artifact(file_path, _load_json, ('rcm', None))
+    if processes is None:
+        return rcm_data
+    selected = set(processes)
+    return [process for process in rcm_data if process['process_name'] in selected]
+
+# Aggregates written next to the RCM output; computed (and cached) from the data when the
+# summary file is missing or older than the output it was derived from (the JSON, or the
+# Parquet copy when there is no JSON), e.g. for the bundled base case
+def load_rcm_summary(file_path: str) -> Dict[str, Any]:
+    summary_path = summary_path_for(file_path)
+    data_paths = [path for path in (file_path, parquet_path_for(file_path)) if os.path.exists(path)]
+    if not data_paths:
+        raise FileNotFoundError(file_path)
+    if os.path.exists(summary_path) and os.path.getmtime(summary_path) >= os.path.getmtime(data_paths[0]):
+        return get_artifact(summary_path, _load_json, 'rcm_summary')
+    return get_artifact(data_paths[0], lambda _: summarize_rcm(load_rcm_data(file_path)), 'rcm_summary_computed')
+
+def load_inventory_graph(file_path: str) -> RCMGraph:
+    data_path = file_path if os.path.exists(file_path) else parquet_path_for(file_path)
+    return get_artifact(data_path, lambda _: RCMGraph(load_rcm_data(file_path)), 'inventory_graph')
+
+def load_bullet_point_index(path: str) -> Dict[str, Any]:
+    # The index is replaced on every append, so its mtime tracks the JSONL file
+    index_path = index_path_for(path)
+    if not os.path.exists(index_path):
+        return load_bullet_points_index(path)
+    return get_artifact(index_path, lambda _: load_bullet_points_index(path), 'bullet_index')
+
+def load_gap_analysis_rubrics(path: str = 'gap_analysis_rubrics.json') -> List[Dict[str, Any]]:
+    return get_artifact(path, _load_json, 'gap_analysis_rubrics')
+
+def load_gap_analysis_results(path: str = 'gap_analysis_results.json') -> List[Dict[str, Any]]:
+    return get_artifact(path, _load_json, 'gap_analysis')
+
+def load_llm_calls(path: str = TELEMETRY_PATH) -> List[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return []
+    return get_artifact(path, load_calls, 'llm_calls')
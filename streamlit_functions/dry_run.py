@@ -0,0 +1,246 @@
+import argparse
+import heapq
+import json
+import statistics
+from typing import List, Dict, Any, Optional
+from streamlit_functions.llm_telemetry import estimate_cost, load_calls
+from streamlit_functions.model_routing import route_models
+
+# Dry-run planner for the LLM pipelines. Every prompt a run would send is built with the same
+# message builders the pipeline uses, but nothing is sent: prompt tokens are counted with
+# tiktoken (messages plus the response_model schema instructor sends as the tool definition),
+# completion tokens and latency come from llm_calls.jsonl when the stage has recorded calls and
+# from the defaults below otherwise. The plan reports call count, tokens, estimated cost and
+# estimated wall-clock time at a given request concurrency, and flags prompts that are large
+# relative to the model's context window or to the rest of their stage.
+#
+#   python -m streamlit_functions.dry_run rcm --context-file business_context.txt --concurrency 4
+#   python -m streamlit_functions.dry_run ingest nydfs_cyber_req.pdf --concurrency 8
+
+# Completion tokens per call when the stage has no telemetry yet
+DEFAULT_COMPLETION_TOKENS = {
+    'generate_process_list': 400,
+    'generate_RCMs': 1800,
+    'generate_BulletPoints': 1200
+}
+OUTPUT_TOKENS_PER_SECOND = {'gpt-4o': 60, 'gpt-4o-mini': 90, 'gpt-4': 20, 'gpt-3.5-turbo': 90}
+REQUEST_OVERHEAD_S = 1.0
+
+CONTEXT_WINDOWS = {'gpt-4o': 128000, 'gpt-4o-mini': 128000, 'gpt-4': 8192, 'gpt-3.5-turbo': 16385}
+# Warn above this share of the context window, or this many times the stage median
+CONTEXT_WARNING_SHARE = 0.5
+OUTLIER_FACTOR = 5
+
+# The process list is only known after the first call; RCM prompts are sized with placeholders
+DEFAULT_PROCESS_COUNT = 8
+PLACEHOLDER_DESCRIPTION = "A brief description of the business process and its importance to the business."
+
+# Chat format overhead per message and for priming the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_encodings: Dict[str, Any] = {}
+
+def _encoding(model: str):
+    if model not in _encodings:
+        import tiktoken
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding('cl100k_base')
+    return _encodings[model]
+
+def _schema(response_model) -> Dict[str, Any]:
+    if hasattr(response_model, 'model_json_schema'):
+        return response_model.model_json_schema()
+    return response_model.schema()
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str, response_model=None) -> int:
+    encoding = _encoding(model)
+    tokens = TOKENS_PER_REPLY
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        for value in message.values():
+            tokens += len(encoding.encode(value))
+    if response_model is not None:
+        tokens += len(encoding.encode(json.dumps(_schema(response_model))))
+    return tokens
+
+# Mean completion tokens and median latency of the successful recorded calls, per stage
+def telemetry_estimates(calls: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    by_stage: Dict[str, List[Dict[str, Any]]] = {}
+    for call in calls:
+        if call['outcome'] == 'ok':
+            by_stage.setdefault(call['stage'], []).append(call)
+    return {
+        stage: {
+            'completion_tokens': statistics.mean(call['completion_tokens'] for call in stage_calls),
+            'latency_s': statistics.median(call['latency_ms'] for call in stage_calls) / 1000
+        }
+        for stage, stage_calls in by_stage.items()
+    }
+
+# Calls are planned on the first model of the stage's route; cascade escalations are not included
+def plan_call(stage: str, messages: List[Dict[str, str]], response_model, label: str,
+              estimates: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    model = route_models(stage)[0]
+    prompt_tokens = count_message_tokens(messages, model, response_model)
+    recorded = estimates.get(stage)
+    if recorded is not None:
+        completion_tokens = round(recorded['completion_tokens'])
+        latency_s = recorded['latency_s']
+    else:
+        completion_tokens = DEFAULT_COMPLETION_TOKENS.get(stage, 500)
+        latency_s = REQUEST_OVERHEAD_S + completion_tokens / OUTPUT_TOKENS_PER_SECOND.get(model, 50)
+    return {
+        'stage': stage,
+        'label': label,
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'latency_s': latency_s,
+        'source': 'telemetry' if recorded is not None else 'default'
+    }
+
+def plan_generate_rcm(business_context: str, process_names: Optional[List[str]] = None,
+                      n_processes: int = DEFAULT_PROCESS_COUNT, telemetry_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    from streamlit_functions.generate_rcm import process_list_messages, rcm_messages, ProcessList, BodyRCMs
+    estimates = telemetry_estimates(load_calls(telemetry_path))
+    names = process_names or [f"Business Process {i + 1}" for i in range(n_processes)]
+
+    calls = [plan_call('generate_process_list', process_list_messages(business_context), ProcessList,
+                       'business context', estimates)]
+    for name in names:
+        calls.append(plan_call('generate_RCMs', rcm_messages(name, PLACEHOLDER_DESCRIPTION), BodyRCMs, name, estimates))
+    return calls
+
+def plan_ingest_document(pdf_file_path: str, telemetry_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    import PyPDF2
+    from streamlit_functions.ingest_document import bullet_point_messages, ListBulletPoints
+    estimates = telemetry_estimates(load_calls(telemetry_path))
+
+    with open(pdf_file_path, "rb") as file:
+        pages = [page.extract_text().strip() for page in PyPDF2.PdfReader(file).pages]
+
+    calls = []
+    for page_num, page_content in enumerate(pages):
+        calls.append(plan_call('generate_BulletPoints', bullet_point_messages(page_content), ListBulletPoints,
+                               f"page {page_num}", estimates))
+
+    return calls
+
+# Longest-processing-time assignment of the calls to `concurrency` request slots
+def _makespan(latencies: List[float], concurrency: int) -> float:
+    slots = [0.0] * max(1, min(concurrency, len(latencies)))
+    for latency in sorted(latencies, reverse=True):
+        heapq.heapreplace(slots, slots[0] + latency)
+    return max(slots, default=0.0)
+
+def _warnings(calls: List[Dict[str, Any]]) -> List[str]:
+    warnings = []
+    medians = {stage: statistics.median(call['prompt_tokens'] for call in calls if call['stage'] == stage)
+               for stage in {call['stage'] for call in calls}}
+    for call in calls:
+        window = CONTEXT_WINDOWS.get(call['model'])
+        if window and call['prompt_tokens'] + call['completion_tokens'] > window:
+            warnings.append(f"{call['stage']} ({call['label']}): {call['prompt_tokens']} prompt tokens exceed the {window}-token context of {call['model']}")
+        elif window and call['prompt_tokens'] > CONTEXT_WARNING_SHARE * window:
+            warnings.append(f"{call['stage']} ({call['label']}): {call['prompt_tokens']} prompt tokens use {call['prompt_tokens'] / window:.0%} of the {call['model']} context")
+        elif call['prompt_tokens'] > OUTLIER_FACTOR * medians[call['stage']]:
+            warnings.append(f"{call['stage']} ({call['label']}): {call['prompt_tokens']} prompt tokens, {call['prompt_tokens'] / medians[call['stage']]:.0f}x the stage median")
+    return warnings
+
+# Stages run one after another (each depends on the previous one's output); calls within a stage
+# share the concurrency budget
+def summarize_plan(calls: List[Dict[str, Any]], concurrency: int = 1) -> Dict[str, Any]:
+    stages = []
+    for stage in dict.fromkeys(call['stage'] for call in calls):
+        stage_calls = [call for call in calls if call['stage'] == stage]
+        prompt_tokens = sum(call['prompt_tokens'] for call in stage_calls)
+        completion_tokens = sum(call['completion_tokens'] for call in stage_calls)
+        latencies = [call['latency_s'] for call in stage_calls]
+        stages.append({
+            'stage': stage,
+            'model': stage_calls[0]['model'],
+            'calls': len(stage_calls),
+            'prompt_tokens': prompt_tokens,
+            'max_prompt_tokens': max(call['prompt_tokens'] for call in stage_calls),
+            'completion_tokens': completion_tokens,
+            'cost_usd': round(sum(estimate_cost(call['model'], call['prompt_tokens'], call['completion_tokens']) for call in stage_calls), 4),
+            'sequential_s': round(sum(latencies), 1),
+            'wall_clock_s': round(_makespan(latencies, concurrency), 1),
+            'estimates': stage_calls[0]['source']
+        })
+
+    return {
+        'concurrency': concurrency,
+        'calls': len(calls),
+        'prompt_tokens': sum(stage['prompt_tokens'] for stage in stages),
+        'completion_tokens': sum(stage['completion_tokens'] for stage in stages),
+        'cost_usd': round(sum(stage['cost_usd'] for stage in stages), 4),
+        'sequential_s': round(sum(stage['sequential_s'] for stage in stages), 1),
+        'wall_clock_s': round(sum(stage['wall_clock_s'] for stage in stages), 1),
+        'stages': stages,
+        'warnings': _warnings(calls)
+    }
+
+def format_plan(name: str, plan: Dict[str, Any]) -> str:
+    lines = [
+        f"Dry run ({name}), concurrency {plan['concurrency']}:",
+        f"{'stage':<32} {'model':<12} {'calls':>6} {'prompt tok':>11} {'max prompt':>11} {'compl tok':>10} {'cost $':>9} {'wall s':>8} {'estimates':>10}"
+    ]
+    for stage in plan['stages']:
+        lines.append(f"{stage['stage'][:32]:<32} {stage['model']:<12} {stage['calls']:>6} {stage['prompt_tokens']:>11} {stage['max_prompt_tokens']:>11} "
+                     f"{stage['completion_tokens']:>10} {stage['cost_usd']:>9.4f} {stage['wall_clock_s']:>8.1f} {stage['estimates']:>10}")
+    lines.append(f"Total: {plan['calls']} calls, {plan['prompt_tokens']} prompt + {plan['completion_tokens']} completion tokens, "
+                 f"${plan['cost_usd']:.4f}, ~{plan['wall_clock_s']:.0f}s wall-clock ({plan['sequential_s']:.0f}s sequential)")
+    for warning in plan['warnings'][:20]:
+        lines.append(f"WARNING: {warning}")
+    if len(plan['warnings']) > 20:
+        lines.append(f"... and {len(plan['warnings']) - 20} more warnings")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate calls, tokens, cost and wall-clock time of a run without calling the API")
+    subparsers = parser.add_subparsers(dest="pipeline", required=True)
+
+    rcm = subparsers.add_parser("rcm", help="RCM generation from a business context")
+    rcm.add_argument("--context", help="Business context text")
+    rcm.add_argument("--context-file", help="File containing the business context")
+    rcm.add_argument("--processes-from", help="File with one process name per line, e.g. init_list.txt from an earlier run")
+    rcm.add_argument("--n-processes", type=int, default=DEFAULT_PROCESS_COUNT, help="Placeholder process count when no names are given")
+
+    ingest = subparsers.add_parser("ingest", help="Document ingestion of a PDF")
+    ingest.add_argument("pdf")
+
+    for subparser in (rcm, ingest):
+        subparser.add_argument("--concurrency", type=int, default=1, help="Concurrent requests within a stage")
+        subparser.add_argument("--telemetry", default=None, help="LLM telemetry JSONL used for completion and latency estimates")
+        subparser.add_argument("--output", help="Write the plan as JSON")
+    args = parser.parse_args()
+
+    if args.pipeline == "rcm":
+        if args.context_file:
+            with open(args.context_file, 'r') as f:
+                business_context = f.read()
+        else:
+            business_context = args.context or ""
+        process_names = None
+        if args.processes_from:
+            with open(args.processes_from, 'r') as f:
+                process_names = [line.strip() for line in f if line.strip()]
+        calls = plan_generate_rcm(business_context, process_names, args.n_processes, args.telemetry)
+        name = "generate_rcm"
+    else:
+        calls = plan_ingest_document(args.pdf, args.telemetry)
+        name = "ingest_document"
+
+    plan = summarize_plan(calls, args.concurrency)
+    print(format_plan(name, plan))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'plan': plan, 'calls': calls}, f, indent=2)
+        print(f"Plan saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+def normalize_text(text: str, lowercase: bool = False) -> str:
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+# Bounded LRU cache of query embeddings keyed by (model name, normalized text).
+# Misses are embedded in one batch with the wrapped embedding function (e.g. Chroma's
+# SentenceTransformerEmbeddingFunction). With cache_path set, entries are also persisted
+# to a SQLite file so reruns of the same lookups skip the encoder entirely.
+class QueryEmbeddingCache:
+    def __init__(self, embedding_function, model_name: str, maxsize: int = 4096,
+                 cache_path: Optional[str] = None, lowercase: bool = False):
+        self.embedding_function = embedding_function
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self.lowercase = lowercase
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if cache_path:
+            self._disk = sqlite3.connect(cache_path, check_same_thread=False)
+            self._disk.execute("CREATE TABLE IF NOT EXISTS query_embeddings (model TEXT, text TEXT, embedding BLOB, PRIMARY KEY (model, text))")
+            self._disk.commit()
+
+    def _remember(self, key, embedding):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, text):
+        if self._disk is None:
+            return None
+        row = self._disk.execute("SELECT embedding FROM query_embeddings WHERE model = ? AND text = ?", (self.model_name, text)).fetchone()
+        if row is None:
+            return None
+        return array('f', row[0]).tolist()
+
+    def _store(self, rows):
+        if self._disk is None or not rows:
+            return
+        self._disk.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (model, text, embedding) VALUES (?, ?, ?)",
+            [(self.model_name, text, array('f', embedding).tobytes()) for text, embedding in rows]
+        )
+        self._disk.commit()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        keys = [normalize_text(text, self.lowercase) for text in texts]
+        embeddings = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                cached = self._entries.get((self.model_name, key))
+                if cached is not None:
+                    self._entries.move_to_end((self.model_name, key))
+                    self.hits += 1
+                else:
+                    cached = self._load(key)
+                    if cached is not None:
+                        self.disk_hits += 1
+                        self._remember((self.model_name, key), cached)
+                if cached is None:
+                    missing.append(key)
+                else:
+                    embeddings[key] = cached
+
+        if missing:
+            encoded = [[float(value) for value in embedding] for embedding in self.embedding_function(missing)]
+            with self._lock:
+                self.misses += len(missing)
+                for key, embedding in zip(missing, encoded):
+                    embeddings[key] = embedding
+                    self._remember((self.model_name, key), embedding)
+                self._store(list(zip(missing, encoded)))
+
+        return [embeddings[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
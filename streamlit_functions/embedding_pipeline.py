@@ -0,0 +1,98 @@
+import hashlib
+import os
+import sqlite3
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+# Batched document encoding for index builds. Texts are deduplicated, looked up in a
+# persistent cache keyed by (model, prompt, text hash), and only the misses are encoded in
+# sized batches across a CPU process pool with one model instance per worker. When the
+# misses do not warrant a pool they are encoded in-process with the caller's `encode`
+# (normally the EmbeddingService's already loaded model).
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class DiskEmbeddingCache:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (model TEXT, hash TEXT, embedding BLOB, PRIMARY KEY (model, hash))")
+        self.conn.commit()
+
+    def get_many(self, model_key: str, hashes: List[str]):
+        found = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, embedding FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                [model_key, *chunk]
+            )
+            for row_hash, blob in rows:
+                found[row_hash] = array('f', blob).tolist()
+        return found
+
+    def put_many(self, model_key: str, items):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, embedding) VALUES (?, ?, ?)",
+            [(model_key, item_hash, array('f', embedding).tobytes()) for item_hash, embedding in items]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# Per-worker model, loaded once by the pool initializer. Pool workers are separate processes,
+# so setting torch's thread count here does not affect the caller.
+_worker_model = None
+
+def _init_worker(model_name: str, device: str, threads: int, trust_remote_code: bool):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device=device, trust_remote_code=trust_remote_code)
+
+def _encode_chunk(texts: List[str], batch_size: int, prompt_name: Optional[str]):
+    return _worker_model.encode(texts, batch_size=batch_size, prompt_name=prompt_name, convert_to_numpy=True).tolist()
+
+def encode_corpus(texts: List[str], model_name: str, prompt_name: Optional[str] = None, batch_size: int = 32,
+                  workers: Optional[int] = None, device: str = "cpu", cache_path: Optional[str] = "embedding_cache.sqlite3",
+                  trust_remote_code: bool = True, encode: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                  model_key: Optional[str] = None) -> List[List[float]]:
+    model_key = model_key or f"{model_name}|{prompt_name or ''}"
+    unique = list(dict.fromkeys(texts))
+    hashes = {text: text_hash(text) for text in unique}
+
+    cache = DiskEmbeddingCache(cache_path) if cache_path else None
+    try:
+        cached = cache.get_many(model_key, list(hashes.values())) if cache else {}
+        missing = [text for text in unique if hashes[text] not in cached]
+        print(f"Embedding {len(texts)} texts: {len(unique)} unique, {len(unique) - len(missing)} cached, {len(missing)} to encode")
+
+        encoded = []
+        if missing:
+            workers = workers or max(1, min(os.cpu_count() or 1, -(-len(missing) // batch_size)))
+            if workers == 1:
+                if encode is None:
+                    raise ValueError("encode_corpus needs an encode function to encode in-process")
+                for start in range(0, len(missing), batch_size):
+                    encoded.extend(encode(missing[start:start + batch_size]))
+            else:
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                chunk_size = batch_size * 4
+                chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(model_name, device, threads, trust_remote_code)) as executor:
+                    for result in executor.map(_encode_chunk, chunks, [batch_size] * len(chunks), [prompt_name] * len(chunks)):
+                        encoded.extend(result)
+
+        new_items = [(hashes[text], embedding) for text, embedding in zip(missing, encoded)]
+        if cache and new_items:
+            cache.put_many(model_key, new_items)
+        cached.update(new_items)
+    finally:
+        if cache:
+            cache.close()
+
+    return [cached[hashes[text]] for text in texts]
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional
+from streamlit_functions.embedding_cache import QueryEmbeddingCache
+from streamlit_functions.embedding_pipeline import encode_corpus
+from streamlit_functions.tracing import span
+
+# Single owner of the embedding models used by the vector stores. Every index build and every
+# retrieval call embeds through an EmbeddingService, which
+#   - keeps one loaded model per (model, backend, device) in the process, shared by every service
+#     on that model whatever its other options (batch size, query cache),
+#   - separates document and query encoding, so asymmetric models (stella's s2p_query prompt)
+#     apply the query prompt to queries only,
+#   - batches document encoding through the persistent embedding cache and query encoding
+#     through the LRU query cache,
+#   - records its version tag in the index (Chroma collection metadata, or a sidecar file for
+#     LanceDB and quantized indexes) and refuses to serve an index built with another model.
+#
+# Defaults come from IRIS_EMBEDDING_MODEL (minilm|stella), IRIS_EMBEDDING_BACKEND (torch|onnx),
+# IRIS_EMBEDDING_DEVICE (cpu|cuda|mps, auto-detected when unset) and IRIS_EMBEDDING_THREADS.
+
+MODELS = {
+    'minilm': {'model_name': 'all-MiniLM-L6-v2', 'document_prompt': None, 'query_prompt': None, 'backends': ('torch', 'onnx')},
+    'stella': {'model_name': 'dunzhang/stella_en_400M_v5', 'document_prompt': None, 'query_prompt': 's2p_query', 'backends': ('torch',)}
+}
+DEFAULT_MODEL = os.getenv('IRIS_EMBEDDING_MODEL', 'minilm')
+DEFAULT_BACKEND = os.getenv('IRIS_EMBEDDING_BACKEND', 'torch')
+DEFAULT_DEVICE = os.getenv('IRIS_EMBEDDING_DEVICE')
+DEFAULT_THREADS = int(os.getenv('IRIS_EMBEDDING_THREADS', '0')) or None
+
+# Collection metadata key holding the version tag
+VERSION_KEY = 'embedding_model'
+
+# Loaded models keyed by (model name, backend, device), shared by all services in the process
+_encoders: Dict[Any, Any] = {}
+_encoders_lock = threading.Lock()
+
+class EmbeddingService:
+    def __init__(self, model: str = DEFAULT_MODEL, backend: Optional[str] = None, device: Optional[str] = None,
+                 threads: Optional[int] = None, batch_size: int = 32, query_cache_size: int = 4096,
+                 query_cache_path: Optional[str] = None):
+        if model not in MODELS:
+            raise ValueError(f"Unknown embedding model: {model}")
+        config = MODELS[model]
+        backend = backend or DEFAULT_BACKEND
+        if backend not in config['backends']:
+            raise ValueError(f"Embedding model {model} has no {backend} backend")
+
+        self.model = model
+        self.model_name = config['model_name']
+        self.document_prompt = config['document_prompt']
+        self.query_prompt = config['query_prompt']
+        self.backend = backend
+        self.device = device or DEFAULT_DEVICE
+        self.threads = threads or DEFAULT_THREADS
+        self.batch_size = batch_size
+        self._encoder = None
+        self.query_cache = QueryEmbeddingCache(self._encode_queries, f"{self.version}|{self.backend}",
+                                               maxsize=query_cache_size, cache_path=query_cache_path)
+
+    # Identifies the vector space of an index. The ONNX backend reproduces the torch vectors
+    # within tolerance, so the backend is deliberately not part of it.
+    @property
+    def version(self) -> str:
+        return f"{self.model_name}|{self.document_prompt}" if self.document_prompt else self.model_name
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'model_name': self.model_name,
+            'backend': self.backend,
+            'device': self._resolve_device(),
+            'document_prompt': self.document_prompt,
+            'query_prompt': self.query_prompt
+        }
+
+    def _resolve_device(self) -> str:
+        if self.device or self.backend == 'onnx':
+            return self.device or 'cpu'
+        try:
+            import torch
+        except ImportError:
+            return 'cpu'
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+    # The first service to load a (model, backend, device) decides its ONNX session options
+    def _get_encoder(self):
+        if self._encoder is None:
+            key = (self.model_name, self.backend, self._resolve_device())
+            with _encoders_lock:
+                encoder = _encoders.get(key)
+                if encoder is None:
+                    if self.backend == 'onnx':
+                        from streamlit_functions.onnx_embedding import OnnxEmbeddingFunction
+                        encoder = OnnxEmbeddingFunction(batch_size=self.batch_size, threads=self.threads)
+                    else:
+                        import torch
+                        from sentence_transformers import SentenceTransformer
+                        if self.threads:
+                            torch.set_num_threads(self.threads)
+                        encoder = SentenceTransformer(self.model_name, device=key[2], trust_remote_code=True)
+                    _encoders[key] = encoder
+            self._encoder = encoder
+        return self._encoder
+
+    def _encode(self, texts: List[str], prompt_name: Optional[str]) -> List[List[float]]:
+        encoder = self._get_encoder()
+        if self.backend == 'onnx':
+            # Only prompt-free models are exported to ONNX (see MODELS)
+            return encoder(texts)
+        return encoder.encode(texts, batch_size=self.batch_size, prompt_name=prompt_name, convert_to_numpy=True).tolist()
+
+    def _encode_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts, self.query_prompt)
+
+    # Documents for an index build. Vectors are cached on disk by (version, backend, text hash).
+    # workers=1 encodes in-process with the shared model; larger CPU builds can fan out over a
+    # process pool (workers=None: one per core), where each worker loads its own copy.
+    def embed_documents(self, texts: List[str], workers: Optional[int] = 1,
+                        cache_path: Optional[str] = "embedding_cache.sqlite3") -> List[List[float]]:
+        with span("embed_documents", model=self.model_name, texts=len(texts)):
+            return self._embed_documents(texts, workers, cache_path)
+
+    def _embed_documents(self, texts: List[str], workers: Optional[int], cache_path: Optional[str]) -> List[List[float]]:
+        model_key = f"{self.version}|{self.backend}"
+        if workers == 1 or self.backend != 'torch' or self._resolve_device() != 'cpu':
+            workers = 1
+        # Misses too few for a pool are encoded with this service's model, in-process
+        return encode_corpus(texts, self.model_name, prompt_name=self.document_prompt, batch_size=self.batch_size,
+                             workers=workers, device='cpu', cache_path=cache_path, model_key=model_key,
+                             encode=lambda batch: self._encode(batch, self.document_prompt))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        with span("embed_queries", model=self.model_name, texts=len(texts)):
+            return self.query_cache.embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.describe(), 'query_cache': self.query_cache.stats()}
+
+    def embedding_function(self):
+        return _service_embedding_function_class()(self)
+
+    # Tag an untagged collection with this service's version, or refuse one built with another model
+    def bind(self, collection):
+        metadata = collection.metadata or {}
+        tag = metadata.get(VERSION_KEY)
+        if tag is None:
+            # Chroma does not allow hnsw:* keys to be changed after creation
+            collection.modify(metadata={**{key: value for key, value in metadata.items() if not key.startswith('hnsw:')},
+                                        VERSION_KEY: self.version})
+        elif tag != self.version:
+            raise ValueError(f"Collection {collection.name} was embedded with {tag}, not {self.version}; rebuild it or switch IRIS_EMBEDDING_MODEL")
+        return collection
+
+    # Same check for file-based indexes (LanceDB tables, quantized indexes) via a sidecar JSON
+    def write_index_tag(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.describe(), f, indent=2)
+
+    def check_index_tag(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            tag = json.load(f)['version']
+        if tag != self.version:
+            raise ValueError(f"Index {path} was embedded with {tag}, not {self.version}")
+
+_embedding_function_class = None
+
+# Chroma calls a collection's embedding function for add(documents=...) and query(query_texts=...)
+# alike, so this adapter cannot tell them apart and embeds as documents. Index builds pass
+# precomputed embeddings and retrieval passes query_embeddings from embed_queries instead.
+# The class is defined on first use so importing this module does not import chromadb.
+def _service_embedding_function_class():
+    global _embedding_function_class
+    if _embedding_function_class is None:
+        try:
+            from chromadb.api.types import EmbeddingFunction
+        except ImportError:
+            EmbeddingFunction = object
+
+        class ServiceEmbeddingFunction(EmbeddingFunction):
+            def __init__(self, service: EmbeddingService):
+                self.service = service
+
+            def __call__(self, input: List[str]) -> List[List[float]]:
+                return self.service.embed_documents(list(input), cache_path=None)
+
+        _embedding_function_class = ServiceEmbeddingFunction
+    return _embedding_function_class
+
+_services: Dict[Any, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+# Process-wide services, one per configuration; services that differ only in options share the
+# loaded model (see _get_encoder)
+def get_embedding_service(model: Optional[str] = None, backend: Optional[str] = None, **options) -> EmbeddingService:
+    key = (model or DEFAULT_MODEL, backend or DEFAULT_BACKEND, tuple(sorted(options.items())))
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = EmbeddingService(key[0], key[1], **options)
+            _services[key] = service
+        return service
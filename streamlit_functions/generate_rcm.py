@@ -1,20 +1,20 @@
-import pandas as pd
 from pydantic import BaseModel, Field
-from openai import AsyncOpenAI
-import instructor
-from typing import List
+from typing import List, Dict, Any, Callable, Optional
 import os
 import asyncio
 import json
-from dotenv import load_dotenv
 from tqdm.auto import tqdm
-import chromadb
-from chromadb.utils import embedding_functions
-
-load_dotenv()
-api_key = os.getenv('open_ai')
-
-instructor_client = instructor.patch(AsyncOpenAI(api_key=api_key))
+from streamlit_functions.rcm_items import COLLECTIONS, flatten_rcm, chroma_record
+from streamlit_functions.rcm_relations import RELATIONS_DB, sync_rcm_relations
+from streamlit_functions.vector_store import get_vector_client, get_rcm_collections, pool_health
+from streamlit_functions.embedding_service import get_embedding_service
+from streamlit_functions.rcm_columnar import write_rcm_parquet, parquet_path_for
+from streamlit_functions.rcm_summary import write_rcm_summary
+from streamlit_functions.process_diff import diff_processes, load_previous_run, write_process_list
+from streamlit_functions.rcm_library import get_rcm_library, library_stats
+from streamlit_functions.model_routing import routed_create, routed_stream
+from streamlit_functions.llm_client import get_instructor_client
+from streamlit_functions.tracing import span, trace_run, traced
 
 class StandardRequirement(BaseModel):
     id: str = Field(description="The ID of the standard requirement")
@@ -56,9 +56,12 @@ class ProcessList(BaseModel):
     processes: List[Process] = Field(description="List of business processes")
 
 # Generate a Risk Control Matrix (RCM) for a given process
-async def generate_RCMs(process_name: str) -> BodyRCMs:
+# The description is part of the prompt, so it is also part of the reuse key in rcm_library
+def rcm_messages(process_name: str, description: str = "") -> List[Dict[str, str]]:
+    process_context = f"Process description: {description}" if description else ""
     user_prompt = f"""
     As an expert auditor, generate a comprehensive and detailed Risk Control Matrix (RCM) for the process: {process_name}.
+    {process_context}
 
     1. Standard:
        - Provide 2-3 relevant industry standard or regulatory framework.
@@ -87,38 +90,102 @@ async def generate_RCMs(process_name: str) -> BodyRCMs:
 
     Ensure all elements are logically connected and provide a cohesive framework for managing risks within the {process_name} process. Use industry-specific terminology and best practices where applicable.
     """
-    
-    try:
-        response = await instructor_client.chat.completions.create(
-            model="gpt-4o",
-            response_model=BodyRCMs,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are an expert auditor with extensive knowledge of risk management and compliance. Given a process name, your task is to:
-                                1. Analyze the process thoroughly, considering its scope, objectives, and potential impact on the organization.
-                                2. Identify relevant industry standards, regulations, and best practices applicable to this process.
-                                3. Think critically about the potential risks, vulnerabilities, and control points within the process.
-                                4. Draw upon your auditing expertise to create a comprehensive and realistic Risk Control Matrix (RCM) that:
-                                a. Accurately reflects the complexities and nuances of the given process.
-                                b. Provides meaningful, actionable insights for risk mitigation.
-                                c. Aligns with industry standards and regulatory requirements.
-                                d. Demonstrates a deep understanding of the interplay between standards, controls, and risks.
-                                Your goal is to generate synthetic RCM data that is not only logically consistent but also highly relevant and valuable for real-world risk management scenarios."""
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
-        )
-        return response
-    except Exception as e:
-        print(f"Error generating RCM for {process_name}: {str(e)}")
-        return BodyRCMs(process_name=process_name, list_standards=[])
+
+    return [
+        {
+            "role": "system",
+            "content": """You are an expert auditor with extensive knowledge of risk management and compliance. Given a process name, your task is to:
+                        1. Analyze the process thoroughly, considering its scope, objectives, and potential impact on the organization.
+                        2. Identify relevant industry standards, regulations, and best practices applicable to this process.
+                        3. Think critically about the potential risks, vulnerabilities, and control points within the process.
+                        4. Draw upon your auditing expertise to create a comprehensive and realistic Risk Control Matrix (RCM) that:
+                        a. Accurately reflects the complexities and nuances of the given process.
+                        b. Provides meaningful, actionable insights for risk mitigation.
+                        c. Aligns with industry standards and regulatory requirements.
+                        d. Demonstrates a deep understanding of the interplay between standards, controls, and risks.
+                        Your goal is to generate synthetic RCM data that is not only logically consistent but also highly relevant and valuable for real-world risk management scenarios."""
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+# RCM of a similar, previously generated process from the semantic reuse library (rcm_library),
+# or None on a miss or when reuse is off. A process the incremental diff marked changed is called
+# with reuse=False, so its edited description is always regenerated
+def reused_RCMs(process_name: str, description: str, reuse: bool) -> Optional[BodyRCMs]:
+    library = get_rcm_library() if reuse else None
+    if library is None:
+        return None
+    with span("rcm_library_lookup", process=process_name):
+        match = library.lookup({'name': process_name, 'description': description})
+    if match is None:
+        return None
+    print(f"Reusing the RCM of {match['source_process']} for {process_name} (similarity {match['similarity']})")
+    return BodyRCMs(**match['rcm'])
+
+def store_RCMs(process_name: str, description: str, rcm: BodyRCMs):
+    library = get_rcm_library()
+    if library is not None:
+        library.store({'name': process_name, 'description': description}, rcm.dict())
+
+# The model comes from the stage's route (model_routing). Throttling is retried by the shared
+# client; errors that survive the retries propagate so the caller can report the process instead
+# of storing an empty RCM for it. With reuse, a similar process in the RCM library is returned
+# without calling the model; every generated RCM is added to the library
+async def generate_RCMs(process_name: str, description: str = "", reuse: bool = True) -> BodyRCMs:
+    rcm = reused_RCMs(process_name, description, reuse)
+    if rcm is not None:
+        return rcm
+    rcm = await routed_create(
+        get_instructor_client(), "generate_RCMs",
+        response_model=BodyRCMs,
+        messages=rcm_messages(process_name, description)
+    )
+    store_RCMs(process_name, description, rcm)
+    return rcm
+
+# Streaming variant: on_partial(process_name, rcm, done) receives every partial BodyRCMs instructor
+# decodes, then the validated complete one with done=True (only the latter for a library hit)
+async def stream_RCMs(process_name: str, on_partial: Callable[[str, Any, bool], None],
+                      description: str = "", reuse: bool = True) -> BodyRCMs:
+    import instructor
+    rcm = reused_RCMs(process_name, description, reuse)
+    if rcm is not None:
+        on_partial(process_name, rcm, True)
+        return rcm
+    partial = None
+    async for partial in routed_stream(
+        get_instructor_client(), "generate_RCMs",
+        response_model=instructor.Partial[BodyRCMs],
+        messages=rcm_messages(process_name, description)
+    ):
+        on_partial(process_name, partial, False)
+    if partial is None:
+        raise ValueError(f"No RCM was streamed for {process_name}")
+    rcm = BodyRCMs(**partial.dict())
+    store_RCMs(process_name, description, rcm)
+    on_partial(process_name, rcm, True)
+    return rcm
+
+# Elements of a (partial) BodyRCMs dict that can no longer change. Lists are decoded in order, so
+# every element but the last is settled, the last one too once a later field of the same RCM has
+# started, and everything once the stream is done
+def settled_rcm_items(rcm: Dict[str, Any], done: bool) -> Dict[str, List[Dict[str, Any]]]:
+    fields = [('standard', 'standards'), ('controls', 'controls'), ('risks', 'risks')]
+    settled = {key: [] for _, key in fields}
+    groups = rcm.get('list_standards') or []
+    for g, group in enumerate(groups):
+        group_done = done or g < len(groups) - 1
+        for f, (field, key) in enumerate(fields):
+            items = group.get(field) or []
+            field_done = group_done or any(group.get(later) for later, _ in fields[f + 1:])
+            settled[key].extend(items if field_done else items[:-1])
+    return settled
 
 # Generate a list of business processes based on the given business context
-async def generate_process_list(business_context: str) -> ProcessList:
+def process_list_messages(business_context: str) -> List[Dict[str, str]]:
     user_prompt = f"""
     As an expert business analyst, generate a comprehensive list of business processes based on the following business context:
 
@@ -130,21 +197,25 @@ async def generate_process_list(business_context: str) -> ProcessList:
 
     Generate 5-10 key processes that are most relevant to the given business context.
     """
-    
+
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert business analyst with extensive knowledge of various industries and business processes. Your task is to analyze the given business context and identify the most relevant business processes."
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+async def generate_process_list(business_context: str) -> ProcessList:
     try:
-        response = await instructor_client.chat.completions.create(
-            model="gpt-4",
+        response = await routed_create(
+            get_instructor_client(), "generate_process_list",
             response_model=ProcessList,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert business analyst with extensive knowledge of various industries and business processes. Your task is to analyze the given business context and identify the most relevant business processes."
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
+            validate=lambda process_list: len(process_list.processes) > 0,
+            messages=process_list_messages(business_context)
         )
         return response
     except Exception as e:
@@ -152,91 +223,160 @@ async def generate_process_list(business_context: str) -> ProcessList:
         return ProcessList(processes=[])
 
 # Updated function to initialize Chroma DB
-def initialize_chroma_db(rcm_data, db_path="./chroma_db"):
+# Syncs the collections to rcm_data: records whose document and metadata are unchanged are left
+# alone, new or changed ones are embedded (through the embedding cache) and upserted, and ids that
+# are no longer produced are deleted, so an incremental run only touches what it regenerated
+@traced()
+def initialize_chroma_db(rcm_data, db_path="./chroma_db", backend=None, embedding_service=None):
     # Ensure the directory exists
     os.makedirs(db_path, exist_ok=True)
     
-    client = chromadb.PersistentClient(path=db_path)
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-
-    collections = {
-        'processes': client.get_or_create_collection('processes', embedding_function=embedding_function),
-        'standards': client.get_or_create_collection('standards', embedding_function=embedding_function),
-        'requirements': client.get_or_create_collection('requirements', embedding_function=embedding_function),
-        'controls': client.get_or_create_collection('controls', embedding_function=embedding_function),
-        'risks': client.get_or_create_collection('risks', embedding_function=embedding_function)
-    }
-
-    def generate_id(prefix, process_index, item_index):
-        return f"{prefix}_{process_index:02d}_{item_index:03d}"
-
-    for process_index, process in enumerate(rcm_data):
-        process_id = generate_id('PROC', process_index, 0)
-        
-        collections['processes'].add(
-            ids=[process_id],
-            documents=[process['process_name']],
-            metadatas=[{'description': process['process_name']}]
-        )
-        
-        standards_data = process['list_standards'][0]
-        
-        for standard_index, standard in enumerate(standards_data['standard']):
-            standard_id = generate_id('STD', process_index, standard_index)
-            
-            collections['standards'].add(
-                ids=[standard_id],
-                documents=[standard['name']],
-                metadatas=[{'process_id': process_id, 'description': standard['description']}]
-            )
-            
-            for req_index, requirement in enumerate(standard['requirements']):
-                req_id = generate_id('REQ', process_index, req_index)
-                
-                collections['requirements'].add(
-                    ids=[req_id],
-                    documents=[requirement['description']],
-                    metadatas=[{'standard_id': standard_id, 'process_id': process_id, 'name': requirement['name']}]
+    client = get_vector_client(db_path, backend)
+    embedding_service = embedding_service or get_embedding_service()
+
+    collections = get_rcm_collections(db_path, embedding_service, backend)
+
+    records = {name: {'ids': [], 'documents': [], 'metadatas': []} for name in collections}
+    with span("flatten_rcm"):
+        for item in flatten_rcm(rcm_data):
+            document, metadata = chroma_record(item)
+            batch = records[COLLECTIONS[item['type']]]
+            batch['ids'].append(item['id'])
+            batch['documents'].append(document)
+            batch['metadatas'].append(metadata)
+
+    for name, batch in records.items():
+        collection = collections[name]
+        existing = collection.get(include=["documents", "metadatas"])
+        stored = {item_id: (document, metadata) for item_id, document, metadata
+                  in zip(existing['ids'], existing['documents'], existing['metadatas'])}
+        current = set(batch['ids'])
+        stale = [item_id for item_id in stored if item_id not in current]
+        changed = [i for i, item_id in enumerate(batch['ids'])
+                   if stored.get(item_id) != (batch['documents'][i], batch['metadatas'][i])]
+
+        with span("index_collection", collection=name, items=len(changed), deleted=len(stale)):
+            if stale:
+                collection.delete(ids=stale)
+            if changed:
+                documents = [batch['documents'][i] for i in changed]
+                collection.upsert(
+                    ids=[batch['ids'][i] for i in changed],
+                    documents=documents,
+                    metadatas=[batch['metadatas'][i] for i in changed],
+                    embeddings=embedding_service.embed_documents(documents)
                 )
-        
-        for control_index, control in enumerate(standards_data['controls']):
-            control_id = generate_id('CTRL', process_index, control_index)
-            
-            collections['controls'].add(
-                ids=[control_id],
-                documents=[control['description']],
-                metadatas=[{'standard_id': control['standard_id'], 'process_id': process_id, 'name': control['name']}]
-            )
-        
-        for risk_index, risk in enumerate(standards_data['risks']):
-            risk_id = generate_id('RISK', process_index, risk_index)
-            
-            collections['risks'].add(
-                ids=[risk_id],
-                documents=[risk['description']],
-                metadatas=[{'control_id': risk['control_id'], 'process_id': process_id, 'name': risk['name']}]
-            )
+        print(f"{name}: {len(changed)} upserted, {len(stale)} deleted, {len(batch['ids']) - len(changed)} unchanged")
+
+    # Mirror the relationships into the SQLite side-store used for relationship reports
+    with span("sync_rcm_relations"):
+        sync_rcm_relations(rcm_data, os.path.join(db_path, RELATIONS_DB))
 
     return client
 
 # Update the main function to include Chroma DB initialization
-async def main(business_context: str):
+# With dry_run=True nothing is sent: the prompts are counted and the plan is printed and returned
+# With on_partial, RCMs are streamed and every partial result is passed to it (see stream_RCMs)
+# With incremental=True only processes that are new or changed since the previous run are
+# regenerated (see process_diff); the others keep their previous RCM
+# With reuse=True processes similar to one generated before, in any run, reuse its RCM (see rcm_library)
+async def main(business_context: str, dry_run: bool = False, concurrency: int = 1,
+               on_partial: Optional[Callable[[str, Any, bool], None]] = None, incremental: bool = True,
+               reuse: bool = True):
+    if dry_run:
+        from streamlit_functions.dry_run import plan_generate_rcm, summarize_plan, format_plan
+        plan = summarize_plan(plan_generate_rcm(business_context), concurrency)
+        print(format_plan("generate_rcm", plan))
+        return plan
+
+    with trace_run("generate_rcm"):
+        return await _generate(business_context, on_partial, incremental, reuse)
+
+async def _generate(business_context: str, on_partial=None, incremental: bool = True, reuse: bool = True):
     process_list = await generate_process_list(business_context)
+    if not process_list.processes:
+        # An empty list would delete every stored RCM from the index
+        print("No processes were generated; keeping the previous RCMs")
+        return None
     
     with open('init_list.txt', 'w') as file:
         for process in process_list.processes:
             file.write(f"{process.name}\n")
+
+    processes = [process.dict() for process in process_list.processes]
+    previous = load_previous_run() if incremental else []
+    with span("diff_processes", previous=len(previous), current=len(processes)):
+        diff = diff_processes(previous, processes, get_embedding_service())
+
+    reused = {}
+    for entry in diff['processes']:
+        if entry['status'] == 'unchanged':
+            reused[entry['index']] = {**previous[entry['previous']]['rcm'], 'process_name': entry['name']}
+    pending = [i for i in range(len(processes)) if i not in reused]
+    changed = {entry['index'] for entry in diff['processes'] if entry['status'] == 'changed'}
+    print(f"Processes: {len(reused)} unchanged, {len(pending)} to generate, {len(diff['removed'])} removed")
+    if on_partial is not None:
+        for rcm in reused.values():
+            on_partial(rcm['process_name'], BodyRCMs(**rcm), True)
     
-    results = []
-    for process in tqdm(process_list.processes, desc="Generating RCMs"):
-        rcm = await generate_RCMs(process.name)
-        results.append(rcm)
-    
-    with open('rcm_output.json', 'w') as f:
-        json.dump([result.dict() for result in results], f, indent=2)
+    # All processes are submitted at once; the shared client's limiter decides how many run
+    with tqdm(total=len(pending), desc="Generating RCMs") as progress:
+        async def generate_process(i):
+            process = process_list.processes[i]
+            # A changed process must not come back from the library with its stale RCM
+            reuse_process = reuse and i not in changed
+            try:
+                with span("process", process=process.name):
+                    if on_partial is not None:
+                        return await stream_RCMs(process.name, on_partial, process.description, reuse_process)
+                    return await generate_RCMs(process.name, process.description, reuse_process)
+            finally:
+                progress.update(1)
+        results = dict(zip(pending, await asyncio.gather(
+            *(generate_process(i) for i in pending), return_exceptions=True)))
+
+    failed = [(processes[i]['name'], result) for i, result in results.items() if isinstance(result, BaseException)]
+    for name, error in failed:
+        print(f"Error generating RCM for {name}: {str(error)}")
+    if reuse and get_rcm_library() is not None:
+        print(f"RCM library: {library_stats()}")
+    with open('failed_processes.txt', 'w') as file:
+        for name, _ in failed:
+            file.write(f"{name}\n")
+
+    # Item ids are positional, so processes that existed before keep their previous order and new
+    # ones go last. A changed process that failed to regenerate keeps its previous RCM and is saved
+    # with its previous description, so the next run tries it again
+    ordered = sorted(diff['processes'], key=lambda entry: (entry['previous'] is None, entry['previous'] or 0, entry['index']))
+    rcm_data = []
+    saved_processes = []
+    for entry in ordered:
+        process = processes[entry['index']]
+        result = reused.get(entry['index']) or results[entry['index']]
+        if isinstance(result, BaseException):
+            if entry['previous'] is None:
+                continue
+            result = {**previous[entry['previous']]['rcm'], 'process_name': process['name']}
+            process = {**process, 'description': previous[entry['previous']].get('description', '')}
+        rcm_data.append(result if isinstance(result, dict) else result.dict())
+        saved_processes.append(process)
+    write_process_list(saved_processes)
+
+    with span("write_outputs"):
+        with open('rcm_output.json', 'w') as f:
+            json.dump(rcm_data, f, indent=2)
+
+        # Columnar copy for lazy, column-projected loads in the UI
+        try:
+            write_rcm_parquet(rcm_data, parquet_path_for('rcm_output.json'))
+        except ImportError:
+            print("pyarrow is not installed; skipping rcm_output.parquet")
+
+        # Written last so it is never older than the outputs it summarizes
+        write_rcm_summary(rcm_data, 'rcm_output.json')
     
-    # Initialize Chroma DB
-    chroma_client = initialize_chroma_db([result.dict() for result in results], db_path="./chroma_db")
+    # Sync Chroma DB with the new RCMs; unchanged items are not re-embedded
+    chroma_client = initialize_chroma_db(rcm_data, db_path="./chroma_db")
     
     return chroma_client
 
@@ -251,19 +391,20 @@ if __name__ == "__main__":
     Their user-friendly interface caters to both small businesses and large 
     corporations looking to enhance their marketing strategies.
     """
-    chroma_client = asyncio.run(main(business_context))
+    asyncio.run(main(business_context))
 
     print("\nRunning Chroma DB tests:")
 
+    # Pooled handles: the same objects initialize_chroma_db wrote through
+    rcm_collections = get_rcm_collections("./chroma_db", get_embedding_service())
+
     # Test 1: Check if all collections exist and have data
-    collections = ["processes", "standards", "requirements", "controls", "risks"]
-    for collection_name in collections:
-        collection = chroma_client.get_collection(collection_name)
+    for collection_name, collection in rcm_collections.items():
         count = collection.count()
         print(f"Test 1: {collection_name.capitalize()} collection count: {count}")
 
     # Test 2: Perform a simple query on the standards collection
-    standards_collection = chroma_client.get_collection("standards")
+    standards_collection = rcm_collections["standards"]
     query_result = standards_collection.query(
         query_texts=["data protection"],
         n_results=1
@@ -275,9 +416,9 @@ if __name__ == "__main__":
         print("No matching standard found.")
 
     # Test 3: Check relationships between collections
-    processes_collection = chroma_client.get_collection("processes")
-    controls_collection = chroma_client.get_collection("controls")
-    risks_collection = chroma_client.get_collection("risks")
+    processes_collection = rcm_collections["processes"]
+    controls_collection = rcm_collections["controls"]
+    risks_collection = rcm_collections["risks"]
 
     # Get a random process
     process = processes_collection.get(limit=1)
@@ -303,7 +444,7 @@ if __name__ == "__main__":
         print(f"- {doc}")
 
     # Test 5: Test filtering
-    requirements_collection = chroma_client.get_collection("requirements")
+    requirements_collection = rcm_collections["requirements"]
     filtered_requirements = requirements_collection.get(
         where={"standard_id": {"$eq": standards_collection.get(limit=1)['ids'][0]}}
     )
@@ -328,4 +469,5 @@ if __name__ == "__main__":
         documents=[original_name]
     )
 
+    print(f"\nVector store pool: {pool_health()}")
     print("\nChroma DB initialization and tests completed.")
\ No newline at end of file
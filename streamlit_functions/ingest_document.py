@@ -1,15 +1,15 @@
-import pandas as pd
 from pydantic import BaseModel, Field, ConfigDict
-from openai import AsyncOpenAI
-import instructor
 from typing import List, Dict, Any
 import os
+import re
 import asyncio
-import json
-from dotenv import load_dotenv
 import glob
 from tqdm.auto import tqdm
 import PyPDF2
+from streamlit_functions.bullet_store import BULLET_POINTS_JSONL, append_bullet_points, remove_document
+from streamlit_functions.model_routing import routed_create
+from streamlit_functions.llm_client import get_instructor_client
+from streamlit_functions.tracing import span, trace_run
 
 # # Get the NYDFS PDF file
 # pdf_file_path = "nydfs_cyber_req.pdf"
@@ -24,11 +24,6 @@ import PyPDF2
 # # Store the text content in a variable
 # nydfs_content = nydfs_text.strip()
 
-load_dotenv()
-api_key = os.getenv('open_ai')
-
-instructor_client = instructor.patch(AsyncOpenAI(api_key=api_key))
-
 class BulletPoint(BaseModel):
     name: str = Field(description="Give a name to the bullet point")
     topics: List[str] = Field(description="The 2-3 word topic name that the bullet point belongs to. This will be used to group bullet points together.")
@@ -36,6 +31,7 @@ class BulletPoint(BaseModel):
     description: str = Field(description="The description of the bullet point in reference to the PDF")
     context: str = Field(description="The context of the bullet point in reference to the PDF")
     pagenum: str = Field(description="The page number of the bullet point in reference to the PDF")
+    confidence: float = Field(description="Confidence from 0 to 1 that the text is copied exactly from the page and the bullet point is described correctly")
     
 class ListBulletPoints(BaseModel):
     list_bullet_points: List[BulletPoint] = Field(description="The list of bullet points")
@@ -50,85 +46,109 @@ class StandardRequirement(BaseModel):
 class ListStandardRequirements(BaseModel):
     list_standard_requirements: List[StandardRequirement] = Field(description="The list of standard requirements extracted from the text's bullet points")
 
-async def generate_BulletPoints(page_content: str) -> ListBulletPoints:
+def bullet_point_messages(page_content: str) -> List[Dict[str, str]]:
     user_prompt = f"""
     You are an expert auditor with extensive knowledge of risk management and compliance. Given a page of the NYDFS Cybersecurity Regulation, your task is to mark bullet points for further processing.
     
     The page content of the NYDFS Cybersecurity Regulation is as follows: {page_content}
     """
-    
+
+    return [
+        {
+            "role": "system",
+            "content": f"""You are an expert compliance auditor whose job is to parse the latest NYDFS Cybersecurity Requirements for Financial Services Companies (Cybersecurity Regulation) and extract bullet points. 
+            """
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+def _letters(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+# Every bullet point's text must be an excerpt of the page, compared on lowercase letters and digits
+# only so PDF line breaks, hyphenation and punctuation do not count. A cheap-tier answer that fails
+# this is escalated (model_routing)
+def bullet_points_on_page(bullet_points: ListBulletPoints, page_content: str) -> bool:
+    page = _letters(page_content)
+    return all(_letters(bullet_point.text) in page for bullet_point in bullet_points.list_bullet_points)
+
+async def generate_BulletPoints(page_content: str) -> ListBulletPoints:
     try:
-        response = await instructor_client.chat.completions.create(
-            model="gpt-4o",
+        response = await routed_create(
+            get_instructor_client(), "generate_BulletPoints",
             response_model=ListBulletPoints,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""You are an expert compliance auditor whose job is to parse the latest NYDFS Cybersecurity Requirements for Financial Services Companies (Cybersecurity Regulation) and extract bullet points. 
-                    """
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
+            validate=lambda bullet_points: bullet_points_on_page(bullet_points, page_content),
+            messages=bullet_point_messages(page_content)
         )
         return response
     except Exception as e:
         print(f"Error generating bullet points for page content: {str(e)}")
         return ListBulletPoints(list_bullet_points=[])
     
-async def generate_standard_requirements(bulletpoint: BulletPoint) -> ListStandardRequirements:
+def standard_requirement_messages(bulletpoint: BulletPoint, document_content: str) -> List[Dict[str, str]]:
     user_prompt = f"""
     You are an expert auditor with extensive knowledge of risk management and compliance. Given a bullet point {bulletpoint}, your task is to analyze whether a given bullet point should be passed down to compliance team for their review for further processing. 
     """
-    
+
+    return [
+        {
+            "role": "system",
+            "content": f"""You are an expert compliance auditor whose job is to parse the latest NYDFS Cybersecurity Requirements for Financial Services Companies (Cybersecurity Regulation) and convert each bullet point into a standard requirement. Any bullet point that is not relevant to the NYDFS Cybersecurity Regulation should be marked as not relevant for a standard requirement.
+            The NYDFS Cybersecurity Regulation is as follows: {document_content}"""
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+async def generate_standard_requirements(bulletpoint: BulletPoint, document_content: str) -> ListStandardRequirements:
     try:
-        response = await instructor_client.chat.completions.create(
-            model="gpt-4o",
+        response = await routed_create(
+            get_instructor_client(), "generate_standard_requirements",
             response_model=ListStandardRequirements,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""You are an expert compliance auditor whose job is to parse the latest NYDFS Cybersecurity Requirements for Financial Services Companies (Cybersecurity Regulation) and convert each bullet point into a standard requirement. Any bullet point that is not relevant to the NYDFS Cybersecurity Regulation should be marked as not relevant for a standard requirement.
-                    The NYDFS Cybersecurity Regulation is as follows: {nydfs_content}"""
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
+            messages=standard_requirement_messages(bulletpoint, document_content)
         )
         return response
     except Exception as e:
         print(f"Error generating standard requirements for {bulletpoint}: {str(e)}")
         return ListStandardRequirements(list_standard_requirements=[])
 
-async def main(pdf_file_path: str):
-    # Read the PDF file
-    with open(pdf_file_path, "rb") as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        nydfs_text = ""
-        for page in pdf_reader.pages:
-            nydfs_text += page.extract_text()
+# With dry_run=True nothing is sent: the prompts are counted and the plan is printed and returned
+async def main(pdf_file_path: str, dry_run: bool = False, concurrency: int = 1):
+    if dry_run:
+        from streamlit_functions.dry_run import plan_ingest_document, summarize_plan, format_plan
+        plan = summarize_plan(plan_ingest_document(pdf_file_path), concurrency)
+        print(format_plan("ingest_document", plan))
+        return plan
+
+    with trace_run("ingest_document"):
+        await _ingest(pdf_file_path)
 
-    # Store the text content in a variable
-    nydfs_content = nydfs_text.strip()
+async def _ingest(pdf_file_path: str):
+    # Read the PDF file
+    with span("pdf_extract", file=os.path.basename(pdf_file_path)), open(pdf_file_path, "rb") as file:
+        pages = [page.extract_text().strip() for page in PyPDF2.PdfReader(file).pages]
 
-    all_bullet_points = []
+    # Bullet points are appended to the JSONL store page by page, replacing any earlier run on the same document
+    output_file = BULLET_POINTS_JSONL
+    document = os.path.basename(pdf_file_path)
+    with span("remove_document"):
+        remove_document(output_file, document)
+    total_bullet_points = 0
     
     # Generate bullet points for each page
-    for page_num, page in enumerate(tqdm(pdf_reader.pages, desc="Processing Pages")):
-        page_content = page.extract_text().strip()
-        bullet_points = await generate_BulletPoints(page_content)
-        all_bullet_points.extend(bullet_points.list_bullet_points)
-    
-    # Save all bullet points to JSON
-    output_file = 'bullet_points.json'
-    with open(output_file, 'w') as f:
-        json.dump({"list_bullet_points": [bp.dict() for bp in all_bullet_points]}, f, indent=2)
+    for page_num, page_content in enumerate(tqdm(pages, desc="Processing Pages")):
+        with span("page", page=page_num):
+            bullet_points = await generate_BulletPoints(page_content)
+            with span("append_bullet_points"):
+                append_bullet_points(output_file, [bp.dict() for bp in bullet_points.list_bullet_points], document, replace=False)
+        total_bullet_points += len(bullet_points.list_bullet_points)
     
-    print(f"Number of bullet points generated: {len(all_bullet_points)}")
+    print(f"Number of bullet points generated: {total_bullet_points}")
     print(f"Process completed. Results saved to {output_file}")
 
 if __name__ == "__main__":
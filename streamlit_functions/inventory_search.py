@@ -0,0 +1,122 @@
+from array import array
+from typing import List, Dict, Any, Optional
+from streamlit_functions.rcm_items import COLLECTIONS, flatten_rcm, chroma_record
+from streamlit_functions.tracing import span
+
+ITEM_TYPES = list(COLLECTIONS)
+
+# In-memory adjacency index over the process -> standard -> requirement / control -> risk hierarchy.
+# Item IDs are interned to integer node numbers and edges are stored in CSR form
+# (offsets + neighbors arrays), so related items for a node are a single slice: O(degree).
+class RCMGraph:
+    def __init__(self, rcm_data: List[Dict[str, Any]]):
+        self.index: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.documents: List[str] = []
+        self.types = array('b')
+        self.processes = array('l')
+
+        edges = []
+        for item in flatten_rcm(rcm_data):
+            node = len(self.ids)
+            self.index[item['id']] = node
+            self.ids.append(item['id'])
+            self.names.append(item['name'])
+            self.documents.append(chroma_record(item)[0])
+            self.types.append(ITEM_TYPES.index(item['type']))
+            self.processes.append(self.index[item['process_id']])
+            for parent_id in item['parent_ids']:
+                edges.append((self.index[parent_id], node))
+
+        # Edges are undirected: count degrees, prefix-sum into offsets, then scatter neighbors
+        self.offsets = array('l', [0]) * (len(self.ids) + 1)
+        for parent, child in edges:
+            self.offsets[parent + 1] += 1
+            self.offsets[child + 1] += 1
+        for node in range(len(self.ids)):
+            self.offsets[node + 1] += self.offsets[node]
+
+        self.neighbors = array('l', [0]) * self.offsets[-1]
+        cursor = array('l', self.offsets[:-1])
+        for parent, child in edges:
+            self.neighbors[cursor[parent]] = child
+            cursor[parent] += 1
+            self.neighbors[cursor[child]] = parent
+            cursor[child] += 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id: str):
+        return item_id in self.index
+
+    def item_type(self, node: int) -> str:
+        return ITEM_TYPES[self.types[node]]
+
+    def related_nodes(self, node: int):
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def related_items(self, item_id: str) -> List[str]:
+        return [self.ids[neighbor] for neighbor in self.related_nodes(self.index[item_id])]
+
+    def describe(self, node: int, distance: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "id": self.ids[node],
+            "type": self.item_type(node).capitalize(),
+            "name": self.names[node],
+            "process": self.names[self.processes[node]],
+            "related_items": [self.names[neighbor] for neighbor in self.related_nodes(node)],
+            "distance": distance
+        }
+
+    # Case-insensitive name/document match, used when no Chroma collections are available
+    def keyword_search(self, query: str, types, n_results: int) -> List[int]:
+        query = query.lower()
+        type_codes = {ITEM_TYPES.index(item_type) for item_type in types}
+        matches = []
+        for node in range(len(self.ids)):
+            if self.types[node] in type_codes and (query in self.names[node].lower() or query in self.documents[node].lower()):
+                matches.append(node)
+                if len(matches) >= n_results * len(types):
+                    break
+        return matches
+
+# Search the inventory for risks, controls and standards related to the query.
+# Semantic matches come from the Chroma collections (one query per collection); related items
+# are then resolved from the in-memory graph instead of a Chroma `where` lookup per hop.
+def search_inventory(query: str, graph: RCMGraph, collections: Optional[Dict[str, Any]] = None,
+                     types=('risk', 'control', 'standard'), n_results: int = 3,
+                     embedding_service=None) -> List[Dict[str, Any]]:
+    with span("search_inventory", types=len(types)):
+        return _search_inventory(query, graph, collections, types, n_results, embedding_service)
+
+def _search_inventory(query, graph, collections, types, n_results, embedding_service):
+    if not query or len(graph) == 0:
+        return []
+
+    if collections is None:
+        return [graph.describe(node) for node in graph.keyword_search(query, types, n_results)]
+
+    # Embed the query once for all collections with the service the collections were built with
+    if embedding_service is not None:
+        query_args = {'query_embeddings': [embedding_service.embed_query(query)]}
+    else:
+        query_args = {'query_texts': [query]}
+
+    hits = []
+    for item_type in types:
+        results = collections[COLLECTIONS[item_type]].query(
+            **query_args,
+            n_results=n_results,
+            include=["documents", "distances"]
+        )
+        for item_id, document, distance in zip(results['ids'][0], results['documents'][0], results['distances'][0]):
+            node = graph.index.get(item_id)
+            # Skip hits indexed from a different RCM run than the one loaded into the graph
+            if node is None or graph.documents[node] != document:
+                continue
+            hits.append((distance, node))
+
+    hits.sort(key=lambda hit: hit[0])
+    return [graph.describe(node, distance) for distance, node in hits]
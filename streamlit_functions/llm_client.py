@@ -0,0 +1,275 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, Optional
+from streamlit_functions.llm_telemetry import record_attempt
+
+# Shared, rate-limit-aware OpenAI client for every pipeline in the process. Each model gets an
+# AdaptiveLimiter that:
+#   - keeps requests-per-minute and tokens-per-minute token buckets, re-synced from the
+#     x-ratelimit-* headers of every response, so the configured limits only matter until the
+#     first reply arrives
+#   - caps in-flight requests with AIMD: +1/concurrency per success, halved on a 429
+#   - pauses all callers for the server's retry-after on a 429
+# Throttled, timed-out and 5xx calls are retried with backoff instead of surfacing to the caller
+# (the SDK's own retries are disabled so every attempt passes through the limiter). A call only
+# fails after IRIS_LLM_MAX_RETRIES retries, or on errors that retrying cannot fix.
+#
+# IRIS_OPENAI_RPM / IRIS_OPENAI_TPM seed the buckets; IRIS_LLM_MAX_CONCURRENCY caps in-flight requests.
+# openai and instructor are imported on first use, so limiter_stats() is cheap to import.
+
+DEFAULT_RPM = int(os.getenv('IRIS_OPENAI_RPM', '500'))
+DEFAULT_TPM = int(os.getenv('IRIS_OPENAI_TPM', '30000'))
+MAX_CONCURRENCY = int(os.getenv('IRIS_LLM_MAX_CONCURRENCY', '16'))
+MAX_RETRIES = int(os.getenv('IRIS_LLM_MAX_RETRIES', '6'))
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+# One 429 burst halves concurrency once, not once per request in flight
+DECREASE_COOLDOWN_S = 2.0
+MAX_BACKOFF_S = 60.0
+# Completion tokens reserved per request when max_tokens is not set
+DEFAULT_COMPLETION_RESERVE = 1000
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    # Seconds until `amount` is available; requests larger than the bucket wait for a full one
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float):
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+# OpenAI reset headers look like "1s", "6m0s" or "20ms"
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+def _header_number(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveLimiter:
+    def __init__(self, model: str, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM,
+                 max_concurrency: int = MAX_CONCURRENCY):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(INITIAL_CONCURRENCY, max_concurrency))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.stats = {'requests': 0, 'throttled': 0, 'retries': 0, 'failures': 0, 'wait_s': 0.0}
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return 0.05
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    # Polls rather than using asyncio primitives: the limiter is shared by every event loop in the
+    # process (each Streamlit action runs its own asyncio.run)
+    async def acquire(self, tokens: float):
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self.in_flight += 1
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    self.stats['requests'] += 1
+                    self.stats['wait_s'] += now - start
+                    return
+            await asyncio.sleep(min(max(wait, 0.01), 1.0))
+
+    # Without used_tokens (the request failed or was cancelled) the reservation is refunded
+    def release(self, reserved_tokens: float, used_tokens: Optional[float] = None, headers=None,
+                throttled: bool = False, retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.tokens.take((used_tokens or 0) - reserved_tokens)
+            self.tokens.level = min(self.tokens.level, self.tokens.capacity)
+            if headers is not None:
+                self.requests.sync(_header_number(headers, 'x-ratelimit-limit-requests'),
+                                   _header_number(headers, 'x-ratelimit-remaining-requests'), now)
+                self.tokens.sync(_header_number(headers, 'x-ratelimit-limit-tokens'),
+                                 _header_number(headers, 'x-ratelimit-remaining-tokens'), now)
+            if throttled:
+                self.stats['throttled'] += 1
+                if now - self.last_decrease > DECREASE_COOLDOWN_S:
+                    self.concurrency = max(MIN_CONCURRENCY, self.concurrency / 2)
+                    self.last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif used_tokens is not None:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                'model': self.model,
+                'concurrency': round(self.concurrency, 2),
+                'in_flight': self.in_flight,
+                'rpm_limit': self.requests.capacity,
+                'rpm_available': round(self.requests.level, 1),
+                'tpm_limit': self.tokens.capacity,
+                'tpm_available': round(self.tokens.level),
+                'paused_s': round(max(0.0, self.paused_until - now), 2),
+                **{key: round(value, 2) if isinstance(value, float) else value for key, value in self.stats.items()}
+            }
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(model: str) -> AdaptiveLimiter:
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = AdaptiveLimiter(model)
+        return _limiters[model]
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.model: limiter.snapshot() for limiter in limiters}
+
+# Rough prompt size (about 4 characters per token) plus the completion reserve; the bucket is
+# corrected with the real usage once the response arrives
+def estimate_prompt_tokens(kwargs: Dict[str, Any]) -> int:
+    characters = sum(len(str(message.get('content') or '')) for message in kwargs.get('messages', []))
+    characters += sum(len(str(tool)) for tool in kwargs.get('tools') or [])
+    return characters // 4
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    return estimate_prompt_tokens(kwargs) + (kwargs.get('max_tokens') or DEFAULT_COMPLETION_RESERVE)
+
+# Seconds to wait before retrying `error`, or None when retrying cannot help
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    import openai
+    if isinstance(error, openai.RateLimitError):
+        if getattr(error, 'code', None) == 'insufficient_quota':
+            return None
+    elif not isinstance(error, (openai.InternalServerError, openai.APITimeoutError, openai.APIConnectionError)):
+        return None
+
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    retry_after_ms = _header_number(headers, 'retry-after-ms')
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    retry_after = _header_number(headers, 'retry-after')
+    if retry_after is not None:
+        return retry_after
+    reset = max(parse_duration(headers.get('x-ratelimit-reset-requests')) or 0,
+                parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0)
+    if reset:
+        return reset
+    return min(MAX_BACKOFF_S, 2 ** attempt) * (0.5 + random.random() / 2)
+
+# A streamed request holds its concurrency slot until the stream is drained. Streams carry no
+# usage, so tokens are estimated: the prompt from its size, the completion as one token per chunk
+async def _released_after(stream, limiter: AdaptiveLimiter, reserved: int, headers, kwargs: Dict[str, Any]):
+    prompt_tokens = estimate_prompt_tokens(kwargs)
+    chunks = 0
+    try:
+        async for chunk in stream:
+            chunks += 1
+            yield chunk
+    finally:
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=chunks)
+        limiter.release(reserved, used_tokens=prompt_tokens + chunks, headers=headers)
+        record_attempt(SimpleNamespace(usage=usage))
+
+def rate_limited(client):
+    raw_create = client.chat.completions.with_raw_response.create
+
+    async def limited_create(*args, **kwargs):
+        import openai
+        limiter = get_limiter(kwargs.get('model'))
+        reserved = estimate_request_tokens(kwargs)
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.acquire(reserved)
+            try:
+                raw = await raw_create(*args, **kwargs)
+                response = raw.parse()
+            except asyncio.CancelledError:
+                limiter.release(reserved)
+                raise
+            except Exception as e:
+                throttled = isinstance(e, openai.RateLimitError)
+                delay = retry_delay(e, attempt)
+                limiter.release(reserved, headers=getattr(getattr(e, 'response', None), 'headers', None),
+                                throttled=throttled, retry_after=delay if throttled else None)
+                record_attempt(throttled=throttled)
+                if delay is None or attempt == MAX_RETRIES:
+                    limiter.count('failures')
+                    raise
+                limiter.count('retries')
+                await asyncio.sleep(delay)
+                continue
+
+            if kwargs.get('stream'):
+                return _released_after(response, limiter, reserved, raw.headers, kwargs)
+            usage = getattr(response, 'usage', None)
+            limiter.release(reserved, used_tokens=usage.total_tokens if usage is not None else reserved, headers=raw.headers)
+            record_attempt(response)
+            return response
+
+    client.chat.completions.create = limited_create
+    return client
+
+_client = None
+_client_lock = threading.Lock()
+
+# The instructor client shared by generation and ingestion; every HTTP attempt is rate limited
+# and counted into the llm_telemetry record of the enclosing tracked_create call
+def get_instructor_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            import instructor
+            from openai import AsyncOpenAI
+            from dotenv import load_dotenv
+            load_dotenv()
+            _client = instructor.patch(rate_limited(AsyncOpenAI(api_key=os.getenv('open_ai'), max_retries=0)))
+        return _client
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+from streamlit_functions.tracing import span
+
+# Per-call telemetry for the structured LLM calls. The shared client in llm_client.py reports
+# every HTTP attempt - including instructor's validation retries and throttled requests - through
+# record_attempt(), which counts it and sums its token usage into the record of the enclosing
+# tracked_create() call. One JSON line per call is appended to the sink:
+#
+#   {"ts", "stage", "model", "tier", "escalation", "latency_ms", "attempts", "retries", "throttled",
+#    "prompt_tokens", "completion_tokens", "cost_usd", "outcome", "error"}
+#
+# Streamed calls (tracked_stream) also record "first_item_ms".
+#
+# IRIS_LLM_TELEMETRY sets the sink path; set it to an empty string to disable recording.
+
+TELEMETRY_PATH = os.getenv('IRIS_LLM_TELEMETRY', 'llm_calls.jsonl')
+
+# USD per 1M (prompt, completion) tokens, from the OpenAI price list; unknown models cost 0
+PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4': (30.00, 60.00),
+    'gpt-3.5-turbo': (0.50, 1.50)
+}
+
+_current_call: ContextVar[Optional[Dict[str, Any]]] = ContextVar('llm_call', default=None)
+_write_lock = threading.Lock()
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+# Count one HTTP attempt (and its token usage) into the enclosing tracked_create record
+def record_attempt(response=None, throttled: bool = False):
+    record = _current_call.get()
+    if record is None:
+        return
+    record['attempts'] += 1
+    record['throttled'] += int(throttled)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        record['prompt_tokens'] += usage.prompt_tokens or 0
+        record['completion_tokens'] += usage.completion_tokens or 0
+
+def write_call(record: Dict[str, Any], path: Optional[str] = None):
+    path = TELEMETRY_PATH if path is None else path
+    if not path:
+        return
+    line = json.dumps(record) + '\n'
+    with _write_lock:
+        with open(path, 'a') as f:
+            f.write(line)
+
+def _new_record(stage: str, model: Optional[str], tier: int, escalation: Optional[str]) -> Dict[str, Any]:
+    return {
+        'ts': datetime.now(timezone.utc).isoformat(),
+        'stage': stage,
+        'model': model,
+        'tier': tier,
+        'escalation': escalation,
+        'attempts': 0,
+        'throttled': 0,
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'outcome': 'ok',
+        'error': None
+    }
+
+def _fail(record: Dict[str, Any], error: Exception):
+    record['outcome'] = 'error'
+    record['error'] = f"{type(error).__name__}: {str(error)}"[:500]
+
+def _finish(record: Dict[str, Any], start: float):
+    record['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    record['retries'] = max(0, record['attempts'] - 1)
+    record['cost_usd'] = round(estimate_cost(record['model'], record['prompt_tokens'], record['completion_tokens']), 6)
+    write_call(record)
+
+# Drop-in for `client.chat.completions.create(**kwargs)` that records the call under `stage`.
+# tier/escalation are set by model_routing for cascaded stages (0 is the first model tried)
+async def tracked_create(client, stage: str, tier: int = 0, escalation: Optional[str] = None, **kwargs):
+    record = _new_record(stage, kwargs.get('model'), tier, escalation)
+    token = _current_call.set(record)
+    start = time.perf_counter()
+    try:
+        with span(f"llm:{stage}", model=record['model']):
+            return await client.chat.completions.create(**kwargs)
+    except Exception as e:
+        _fail(record, e)
+        raise
+    finally:
+        _current_call.reset(token)
+        _finish(record, start)
+
+# Streaming counterpart for instructor Partial/Iterable response models: yields every object
+# instructor decodes and writes the record when the stream ends, with the time to the first one
+# as first_item_ms
+async def tracked_stream(client, stage: str, tier: int = 0, escalation: Optional[str] = None, **kwargs):
+    record = _new_record(stage, kwargs.get('model'), tier, escalation)
+    token = _current_call.set(record)
+    start = time.perf_counter()
+    try:
+        with span(f"llm:{stage}", model=record['model'], stream=True):
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            async for item in stream:
+                if 'first_item_ms' not in record:
+                    record['first_item_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                yield item
+    except Exception as e:
+        _fail(record, e)
+        raise
+    finally:
+        try:
+            _current_call.reset(token)
+        except ValueError:
+            # An abandoned stream is closed from another context
+            pass
+        _finish(record, start)
+
+def load_calls(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    path = TELEMETRY_PATH if path is None else path
+    if not path or not os.path.exists(path):
+        return []
+    calls = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                calls.append(json.loads(line))
+    return calls
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Per-stage throughput, latency percentiles, retries, 429s, escalations, tokens and cost.
+# escalation_rate is escalated attempts per first-tier attempt
+def stage_metrics(calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_stage: Dict[str, List[Dict[str, Any]]] = {}
+    for call in calls:
+        by_stage.setdefault(call['stage'], []).append(call)
+
+    metrics = []
+    for stage, stage_calls in sorted(by_stage.items()):
+        latencies = [call['latency_ms'] for call in stage_calls]
+        first_items = [call['first_item_ms'] for call in stage_calls if call.get('first_item_ms') is not None]
+        timestamps = sorted(datetime.fromisoformat(call['ts']) for call in stage_calls)
+        span_minutes = (timestamps[-1] - timestamps[0]).total_seconds() / 60
+        errors = sum(call['outcome'] != 'ok' for call in stage_calls)
+        first_tier = sum(call.get('tier', 0) == 0 for call in stage_calls)
+        escalations = len(stage_calls) - first_tier
+        metrics.append({
+            'stage': stage,
+            'calls': len(stage_calls),
+            'errors': errors,
+            'error_rate': round(errors / len(stage_calls), 3),
+            'retries': sum(call['retries'] for call in stage_calls),
+            'throttled': sum(call.get('throttled', 0) for call in stage_calls),
+            'models': ', '.join(sorted({call['model'] for call in stage_calls if call['model']})),
+            'escalations': escalations,
+            'escalation_rate': round(escalations / first_tier, 3) if first_tier else 0.0,
+            'p50_ms': round(_percentile(latencies, 0.5), 1),
+            'p95_ms': round(_percentile(latencies, 0.95), 1),
+            'p50_first_item_ms': round(_percentile(first_items, 0.5), 1) if first_items else None,
+            'calls_per_min': round(len(stage_calls) / span_minutes, 2) if span_minutes > 0 else None,
+            'prompt_tokens': sum(call['prompt_tokens'] for call in stage_calls),
+            'completion_tokens': sum(call['completion_tokens'] for call in stage_calls),
+            'cost_usd': round(sum(call['cost_usd'] for call in stage_calls), 4)
+        })
+    return metrics
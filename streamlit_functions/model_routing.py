@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+from typing import List, Dict, Any, Callable, Optional
+from streamlit_functions.llm_telemetry import tracked_create, tracked_stream
+
+# Per-stage model routing. Each pipeline stage maps to a list of models tried in order: a
+# single-model route is a plain assignment, a longer one is a cascade that starts on the cheap
+# model and escalates to the next one when
+#   - the structured output fails validation (instructor gives up after its retries),
+#   - the caller's validate(response) returns False, or
+#   - the smallest `confidence_field` value anywhere in the response is below `min_confidence`.
+# The last model's answer is always returned. Every attempt is recorded by llm_telemetry with its
+# tier and the reason it was escalated to, so stage_metrics() reports per-stage escalation rates.
+#
+# Routes can be overridden from a JSON file (IRIS_MODEL_ROUTING, default model_routing.json)
+# with the same shape as DEFAULT_ROUTES; stages missing from the file keep their defaults.
+
+ROUTING_PATH = os.getenv('IRIS_MODEL_ROUTING', 'model_routing.json')
+
+DEFAULT_ROUTES = {
+    'generate_process_list': {'models': ['gpt-4o-mini', 'gpt-4o']},
+    'generate_RCMs': {'models': ['gpt-4o']},
+    'generate_BulletPoints': {'models': ['gpt-4o-mini', 'gpt-4o'], 'confidence_field': 'confidence', 'min_confidence': 0.7}
+}
+DEFAULT_MODEL = 'gpt-4o'
+
+_routes: Optional[Dict[str, Dict[str, Any]]] = None
+_routes_lock = threading.Lock()
+
+def load_routes(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    path = ROUTING_PATH if path is None else path
+    routes = {stage: dict(route) for stage, route in DEFAULT_ROUTES.items()}
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            for stage, route in json.load(f).items():
+                routes[stage] = {**routes.get(stage, {}), **route}
+    return routes
+
+def get_route(stage: str) -> Dict[str, Any]:
+    global _routes
+    with _routes_lock:
+        if _routes is None:
+            _routes = load_routes()
+        return _routes.get(stage, {'models': [DEFAULT_MODEL]})
+
+def route_models(stage: str) -> List[str]:
+    return list(get_route(stage)['models'])
+
+# Smallest value of `field` anywhere in the (nested) response, or None if it never appears
+def min_confidence(response, field: Optional[str]) -> Optional[float]:
+    if not field:
+        return None
+    values = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == field and isinstance(item, (int, float)) and not isinstance(item, bool):
+                    values.append(float(item))
+                else:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(response.dict())
+    return min(values, default=None)
+
+# Drop-in for tracked_create(client, stage, model=..., ...) with the model chosen by the stage's route
+async def routed_create(client, stage: str, validate: Optional[Callable[[Any], bool]] = None, **kwargs):
+    import openai
+    route = get_route(stage)
+    models = route['models']
+    escalation = None
+    for tier, model in enumerate(models):
+        last = tier == len(models) - 1
+        try:
+            response = await tracked_create(client, stage, tier=tier, escalation=escalation, model=model, **kwargs)
+        except openai.APIError:
+            # Transport and API errors are the client's to retry; a bigger model will not fix them
+            raise
+        except Exception:
+            if last:
+                raise
+            escalation = 'validation'
+            continue
+
+        if last:
+            return response
+        if validate is not None and not validate(response):
+            escalation = 'validation'
+            continue
+        confidence = min_confidence(response, route.get('confidence_field'))
+        if confidence is not None and confidence < route.get('min_confidence', 0.0):
+            escalation = 'low_confidence'
+            continue
+        return response
+
+# Streamed output is shown as it arrives and cannot be escalated afterwards, so streams go straight
+# to the last (strongest) model of the route
+async def routed_stream(client, stage: str, **kwargs):
+    async for item in tracked_stream(client, stage, model=route_models(stage)[-1], **kwargs):
+        yield item
@@ -0,0 +1,332 @@
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+from streamlit_functions.quantized_index import quantize, int8_scale, approximate_scores, DEFAULT_RESCORE_FACTOR
+
+# Brute-force vector store for small and mid-sized inventories (up to ~200k items).
+# Each collection keeps unit-norm embeddings in a float16 memory-mapped matrix
+# (<name>.f16) with parallel ids/documents/metadatas in <name>.json. Queries are one
+# vectorized matmul plus argpartition per block of MATMUL_CHUNK_ROWS rows: each block is
+# upcast to float32 (BLAS has no float16 matmul) only while it is scored, and the per-block
+# top-k are merged, so no full float32 copy of the matrix is ever held. `where` filters are
+# resolved from precomputed boolean masks per (metadata key, value).
+#
+# With IRIS_NUMPY_QUANTIZE=int8 or binary the matrix is not scanned at all: the first pass scans
+# compact codes held in memory (see quantized_index) and the top n_results * rescore factor
+# candidates are rescored exactly from the float16 memmap, which is only paged in for those rows.
+#
+# NumpyVectorClient and NumpyCollection mirror the subset of the chromadb client and
+# collection API that initialize_chroma_db and the retrieval functions use, so either
+# backend can sit behind get_vector_client.
+
+MATMUL_CHUNK_ROWS = 8192
+QUANTIZE = os.getenv('IRIS_NUMPY_QUANTIZE') or None
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class NumpyCollection:
+    def __init__(self, path: str, name: str, embedding_function=None, metadata: Optional[Dict[str, Any]] = None,
+                 quantize: Optional[str] = QUANTIZE):
+        self.name = name
+        self.quantize = quantize
+        self.embedding_function = embedding_function
+        self.metadata = metadata
+        self._matrix_path = os.path.join(path, f"{name}.f16")
+        self._meta_path = os.path.join(path, f"{name}.json")
+        self._lock = threading.RLock()
+        self.ids: List[str] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        self.dim = 0
+        self._matrix = None
+        self._codes = None
+        self._masks: Dict[Any, np.ndarray] = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'r') as f:
+                stored = json.load(f)
+            self.ids = stored['ids']
+            self.documents = stored['documents']
+            self.metadatas = stored['metadatas']
+            self.dim = stored['dim']
+            self.metadata = stored.get('metadata')
+        self._position = {item_id: i for i, item_id in enumerate(self.ids)}
+        self._open_matrix()
+
+    def _open_matrix(self):
+        if self.ids and self.dim:
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float16, mode='r+', shape=(len(self.ids), self.dim))
+        else:
+            self._matrix = None
+        self._codes = None
+        self._masks = {}
+
+    # Exact scan block by block over the memmap; returns each query's k best (positions, scores)
+    def _exact_top(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray]):
+        candidates, scores = [], []
+        for start in range(0, len(self.ids), MATMUL_CHUNK_ROWS):
+            block = queries @ np.asarray(self._matrix[start:start + MATMUL_CHUNK_ROWS], dtype=np.float32).T
+            if mask is not None:
+                block[:, ~mask[start:start + MATMUL_CHUNK_ROWS]] = -np.inf
+            block_k = min(k, block.shape[1])
+            top = np.argpartition(-block, block_k - 1, axis=1)[:, :block_k]
+            scores.append(np.take_along_axis(block, top, axis=1))
+            candidates.append(top + start)
+        return np.hstack(candidates), np.hstack(scores)
+
+    # (codes, scale) for the quantized first pass, encoded chunk by chunk from the memmap
+    def _quantized_codes(self):
+        if self._codes is None:
+            def chunks():
+                for start in range(0, len(self.ids), MATMUL_CHUNK_ROWS):
+                    yield np.asarray(self._matrix[start:start + MATMUL_CHUNK_ROWS], dtype=np.float32)
+            scale = np.max([int8_scale(chunk) for chunk in chunks()], axis=0) if self.quantize == 'int8' else None
+            codes = np.vstack([quantize(chunk, self.quantize, scale)[0] for chunk in chunks()])
+            self._codes = (codes, scale)
+        return self._codes
+
+    # Quantized scan, then exact float16 rescoring of the best candidates per query
+    def _quantized_top(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray]):
+        codes, scale = self._quantized_codes()
+        scores = approximate_scores(codes, scale, self.quantize, queries)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        n_candidates = min(len(self.ids), k * DEFAULT_RESCORE_FACTOR[self.quantize])
+        candidates = np.sort(np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates], axis=1)
+        exact = np.empty(candidates.shape, dtype=np.float32)
+        for row, (query, positions) in enumerate(zip(queries, candidates)):
+            exact[row] = np.asarray(self._matrix[positions], dtype=np.float32) @ query
+        exact[np.take_along_axis(scores, candidates, axis=1) == -np.inf] = -np.inf
+        return candidates, exact
+
+    def _save_meta(self):
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'dim': self.dim, 'metadata': self.metadata, 'ids': self.ids, 'documents': self.documents, 'metadatas': self.metadatas}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _embed(self, documents, embeddings):
+        if embeddings is not None:
+            return _normalize(embeddings)
+        if self.embedding_function is None:
+            raise ValueError(f"Collection {self.name} has no embedding function; pass embeddings explicitly")
+        return _normalize(self.embedding_function(list(documents)))
+
+    def modify(self, metadata: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.metadata = metadata
+            self._save_meta()
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[str], documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None,
+            embeddings=None):
+        with self._lock:
+            # Like Chroma, IDs that already exist are ignored
+            new = [i for i, item_id in enumerate(ids) if item_id not in self._position]
+            if not new:
+                return
+            documents = documents or [None] * len(ids)
+            metadatas = metadatas or [None] * len(ids)
+            vectors = self._embed([documents[i] for i in new], None if embeddings is None else [embeddings[i] for i in new])
+            if self.dim and vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {self.dim}")
+            self.dim = vectors.shape[1]
+
+            self._matrix = None
+            with open(self._matrix_path, 'ab') as f:
+                f.write(vectors.astype(np.float16).tobytes())
+            for i in new:
+                self._position[ids[i]] = len(self.ids)
+                self.ids.append(ids[i])
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+            self._save_meta()
+            self._open_matrix()
+
+    def update(self, ids: List[str], documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None,
+               embeddings=None):
+        with self._lock:
+            positions = [self._position[item_id] for item_id in ids]
+            if documents is not None or embeddings is not None:
+                vectors = self._embed(documents, embeddings)
+                self._matrix[positions] = vectors.astype(np.float16)
+                self._matrix.flush()
+                self._codes = None
+            for i, position in enumerate(positions):
+                if documents is not None:
+                    self.documents[position] = documents[i]
+                if metadatas is not None:
+                    self.metadatas[position] = metadatas[i]
+            self._masks = {}
+            self._save_meta()
+
+    def upsert(self, ids: List[str], documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None,
+               embeddings=None):
+        with self._lock:
+            existing = [i for i, item_id in enumerate(ids) if item_id in self._position]
+            new = [i for i, item_id in enumerate(ids) if item_id not in self._position]
+            for subset, method in ((existing, self.update), (new, self.add)):
+                if subset:
+                    method(
+                        ids=[ids[i] for i in subset],
+                        documents=None if documents is None else [documents[i] for i in subset],
+                        metadatas=None if metadatas is None else [metadatas[i] for i in subset],
+                        embeddings=None if embeddings is None else [embeddings[i] for i in subset]
+                    )
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            keep = np.ones(len(self.ids), dtype=bool)
+            if ids is not None:
+                keep[[self._position[item_id] for item_id in ids if item_id in self._position]] = False
+            if where is not None:
+                keep &= ~self._where_mask(where)
+            if keep.all():
+                return
+            vectors = np.array(self._matrix[keep]) if self._matrix is not None else np.empty((0, self.dim), dtype=np.float16)
+            self._matrix = None
+            with open(self._matrix_path, 'wb') as f:
+                f.write(vectors.tobytes())
+            positions = np.flatnonzero(keep)
+            self.ids = [self.ids[i] for i in positions]
+            self.documents = [self.documents[i] for i in positions]
+            self.metadatas = [self.metadatas[i] for i in positions]
+            self._position = {item_id: i for i, item_id in enumerate(self.ids)}
+            self._save_meta()
+            self._open_matrix()
+
+    # Boolean mask for a single metadata equality, computed once and reused across queries
+    def _mask(self, key: str, value) -> np.ndarray:
+        mask = self._masks.get((key, value))
+        if mask is None:
+            mask = np.fromiter(((metadata or {}).get(key) == value for metadata in self.metadatas), dtype=bool, count=len(self.ids))
+            self._masks[(key, value)] = mask
+        return mask
+
+    def _where_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == '$and':
+                for clause in condition:
+                    mask &= self._where_mask(clause)
+            elif key == '$or':
+                mask &= np.logical_or.reduce([self._where_mask(clause) for clause in condition])
+            elif isinstance(condition, dict):
+                for operator, value in condition.items():
+                    if operator == '$eq':
+                        mask &= self._mask(key, value)
+                    elif operator == '$ne':
+                        mask &= ~self._mask(key, value)
+                    elif operator == '$in':
+                        mask &= np.logical_or.reduce([self._mask(key, v) for v in value])
+                    else:
+                        raise ValueError(f"Unsupported where operator: {operator}")
+            else:
+                mask &= self._mask(key, condition)
+        return mask
+
+    def _select(self, positions, include) -> Dict[str, Any]:
+        result = {'ids': [self.ids[i] for i in positions]}
+        if 'documents' in include:
+            result['documents'] = [self.documents[i] for i in positions]
+        if 'metadatas' in include:
+            result['metadatas'] = [self.metadatas[i] for i in positions]
+        if 'embeddings' in include:
+            result['embeddings'] = [self._matrix[i].astype(np.float32).tolist() for i in positions]
+        return result
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+            offset: int = 0, include=("documents", "metadatas")) -> Dict[str, Any]:
+        with self._lock:
+            if ids is not None:
+                positions = [self._position[item_id] for item_id in ids if item_id in self._position]
+            else:
+                positions = list(range(len(self.ids)))
+            if where is not None:
+                mask = self._where_mask(where)
+                positions = [i for i in positions if mask[i]]
+            positions = positions[offset:offset + limit if limit is not None else None]
+            return self._select(positions, include)
+
+    # Batched top-k: candidates from the exact block scan or the quantized pass, merged with one
+    # argpartition per row.
+    # Distances are squared L2 between unit vectors (2 - 2 * cosine), matching Chroma's default space.
+    def query(self, query_embeddings=None, query_texts: Optional[List[str]] = None, n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None, include=("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        if query_embeddings is None:
+            if self.embedding_function is None:
+                raise ValueError(f"Collection {self.name} has no embedding function; pass query_embeddings")
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = _normalize(query_embeddings)
+
+        with self._lock:
+            result = {key: [] for key in ('ids', 'documents', 'metadatas', 'distances') if key == 'ids' or key in include}
+            if self._matrix is None:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            k = min(n_results, len(self.ids))
+            mask = self._where_mask(where) if where is not None else None
+            if self.quantize:
+                candidates, scores = self._quantized_top(queries, k, mask)
+            else:
+                candidates, scores = self._exact_top(queries, k, mask)
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top = np.take_along_axis(candidates, top, axis=1)
+
+            for row, row_scores in zip(top, top_scores):
+                positions = [int(i) for i, score in zip(row, row_scores) if score != -np.inf]
+                selected = self._select(positions, include)
+                for key in selected:
+                    result[key].append(selected[key])
+                if 'distances' in result:
+                    result['distances'].append([float(2 - 2 * score) for score in row_scores[:len(positions)]])
+            return result
+
+class NumpyVectorClient:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, embedding_function=None, metadata=None) -> NumpyCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = NumpyCollection(self.path, name, embedding_function, metadata)
+                self._collections[name] = collection
+            elif embedding_function is not None:
+                collection.embedding_function = embedding_function
+            return collection
+
+    def get_collection(self, name: str, embedding_function=None) -> NumpyCollection:
+        if name not in self._collections and not os.path.exists(os.path.join(self.path, f"{name}.json")):
+            raise ValueError(f"Collection {name} does not exist.")
+        return self.get_or_create_collection(name, embedding_function)
+
+    def list_collections(self) -> List[str]:
+        return sorted(name[:-len(".json")] for name in os.listdir(self.path) if name.endswith(".json"))
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+            for suffix in (".f16", ".json"):
+                file_path = os.path.join(self.path, f"{name}{suffix}")
+                if os.path.exists(file_path):
+                    os.remove(file_path)
@@ -0,0 +1,104 @@
+import os
+from typing import List, Optional
+import numpy as np
+
+try:
+    from chromadb.api.types import EmbeddingFunction
+except ImportError:
+    EmbeddingFunction = object
+
+# CPU embedding backend for all-MiniLM-L6-v2 without PyTorch at runtime: the transformer is
+# exported once to ONNX and dynamically quantized to int8, then served with onnxruntime and the
+# `tokenizers` library. Pooling matches the sentence-transformers pipeline (mean pooling over
+# the attention mask, then L2 normalization), so vectors stay compatible with collections built
+# by SentenceTransformerEmbeddingFunction within a small tolerance.
+#
+#   python -m streamlit_functions.onnx_embedding --export
+
+HF_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MODEL_DIR = os.getenv('IRIS_ONNX_MODEL_DIR', os.path.join("models", "all-MiniLM-L6-v2-onnx-int8"))
+MODEL_FILE = "model.onnx"
+MAX_LENGTH = 256
+
+# One-off export: needs torch, transformers and onnxruntime, which are not needed to serve the model
+def export_onnx_model(model_name: str = HF_MODEL, output_dir: str = DEFAULT_MODEL_DIR) -> str:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    inputs = tokenizer(["export sample"], return_tensors="pt")
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(inputs[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=14
+        )
+    quantize_dynamic(fp32_path, os.path.join(output_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    print(f"Exported int8 ONNX model to {output_dir}")
+    return output_dir
+
+class OnnxEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, batch_size: int = 32, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if not os.path.exists(os.path.join(model_dir, MODEL_FILE)):
+            print(f"No ONNX model in {model_dir}; exporting {HF_MODEL} (one-off)")
+            export_onnx_model(output_dir=model_dir)
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_dir, MODEL_FILE), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        embeddings = []
+        for start in range(0, len(input), self.batch_size):
+            encodings = self.tokenizer.encode_batch(list(input[start:start + self.batch_size]))
+            feeds = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            }
+            hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+            mask = feeds["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings.extend(pooled.tolist())
+        return embeddings
+
+# Minimum and mean cosine similarity between ONNX and PyTorch vectors for the same texts
+def compare_with_sentence_transformers(texts: List[str], onnx_function: Optional[OnnxEmbeddingFunction] = None):
+    from sentence_transformers import SentenceTransformer
+    reference = SentenceTransformer("all-MiniLM-L6-v2", device="cpu").encode(texts, normalize_embeddings=True)
+    candidate = np.asarray((onnx_function or OnnxEmbeddingFunction())(texts))
+    similarities = (reference * candidate).sum(axis=1)
+    return {'min_cosine': float(similarities.min()), 'mean_cosine': float(similarities.mean())}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to an int8 ONNX model")
+    parser.add_argument("--export", action="store_true")
+    parser.add_argument("--output-dir", default=DEFAULT_MODEL_DIR)
+    args = parser.parse_args()
+    if args.export:
+        export_onnx_model(output_dir=args.output_dir)
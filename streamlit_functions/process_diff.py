@@ -0,0 +1,81 @@
+import json
+import os
+import re
+from typing import List, Dict, Any
+import numpy as np
+
+# Diff of a newly generated process list against the previous run, so RCM generation only
+# re-runs for processes that are new or whose meaning changed. Processes are paired first by
+# normalized name, then greedily by cosine similarity of their "name: description" embeddings.
+#   unchanged - paired and similar enough to reuse the previous RCM (renamed if the name differs)
+#   changed   - paired but the description moved; the RCM is regenerated
+#   new       - no counterpart in the previous run
+# Previous processes left unpaired are reported as removed.
+#
+# IRIS_PROCESS_MATCH_THRESHOLD pairs differently named processes; IRIS_PROCESS_REUSE_THRESHOLD
+# decides whether a pair keeps its RCM.
+
+PROCESS_LIST_PATH = "process_list.json"
+MATCH_THRESHOLD = float(os.getenv('IRIS_PROCESS_MATCH_THRESHOLD', '0.85'))
+REUSE_THRESHOLD = float(os.getenv('IRIS_PROCESS_REUSE_THRESHOLD', '0.95'))
+
+def normalize_name(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+def process_text(process: Dict[str, str]) -> str:
+    return f"{process['name']}: {process.get('description', '')}"
+
+def write_process_list(processes: List[Dict[str, str]], path: str = PROCESS_LIST_PATH):
+    with open(path, 'w') as f:
+        json.dump(processes, f, indent=2)
+
+# The previous run's processes with their RCMs. Runs from before process_list.json was written
+# fall back to the names in the RCM output, which still pair by name.
+def load_previous_run(rcm_path: str = 'rcm_output.json', process_list_path: str = PROCESS_LIST_PATH) -> List[Dict[str, Any]]:
+    if not os.path.exists(rcm_path):
+        return []
+    with open(rcm_path, 'r') as f:
+        rcms = {rcm['process_name']: rcm for rcm in json.load(f)}
+    if os.path.exists(process_list_path):
+        with open(process_list_path, 'r') as f:
+            processes = json.load(f)
+    else:
+        processes = [{'name': name, 'description': ''} for name in rcms]
+    return [{**process, 'rcm': rcms[process['name']]} for process in processes if process['name'] in rcms]
+
+def diff_processes(previous: List[Dict[str, Any]], current: List[Dict[str, str]], embedding_service,
+                   match_threshold: float = MATCH_THRESHOLD, reuse_threshold: float = REUSE_THRESHOLD) -> Dict[str, Any]:
+    entries = [{'index': i, 'name': process['name'], 'status': 'new', 'previous': None, 'similarity': None}
+               for i, process in enumerate(current)]
+    if not previous or not current:
+        return {'processes': entries, 'removed': [process['name'] for process in previous]}
+
+    vectors = np.asarray(embedding_service.embed_documents([process_text(process) for process in previous + current]), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors[len(previous):] @ vectors[:len(previous)].T
+
+    pairs = {}
+    previous_by_name = {}
+    for j, process in enumerate(previous):
+        previous_by_name.setdefault(normalize_name(process['name']), j)
+    for i, process in enumerate(current):
+        j = previous_by_name.get(normalize_name(process['name']))
+        if j is not None and j not in pairs.values():
+            pairs[i] = j
+
+    # Remaining processes pair by similarity, best pairs first
+    candidates = sorted(((similarity[i, j], i, j) for i in range(len(current)) for j in range(len(previous))
+                         if i not in pairs and similarity[i, j] >= match_threshold), reverse=True)
+    for score, i, j in candidates:
+        if i not in pairs and j not in pairs.values():
+            pairs[i] = j
+
+    for i, j in pairs.items():
+        entry = entries[i]
+        entry['previous'] = j
+        entry['similarity'] = round(float(similarity[i, j]), 4)
+        same_description = normalize_name(current[i].get('description', '')) == normalize_name(previous[j].get('description', ''))
+        entry['status'] = 'unchanged' if same_description or similarity[i, j] >= reuse_threshold else 'changed'
+
+    paired = set(pairs.values())
+    return {'processes': entries, 'removed': [process['name'] for j, process in enumerate(previous) if j not in paired]}
@@ -0,0 +1,108 @@
+import os
+from typing import List, Dict, Any, Optional
+from streamlit_functions.rcm_items import flatten_rcm
+
+# Columnar (Parquet) form of the RCM output: one flattened row per process, standard,
+# requirement, control and risk. Readers project only the columns they need and push
+# process filters down to the row groups, instead of json.load-ing the whole nested file.
+
+COLUMNS = ['id', 'type', 'process_id', 'process_name', 'group_index', 'source_id', 'name', 'description',
+           'parent_id', 'source_parent_id']
+
+ROW_GROUP_SIZE = 65536
+
+def parquet_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + '.parquet'
+
+def write_rcm_parquet(rcm_data: List[Dict[str, Any]], path: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = {column: [] for column in COLUMNS}
+    for item in flatten_rcm(rcm_data):
+        columns['id'].append(item['id'])
+        columns['type'].append(item['type'])
+        columns['process_id'].append(item['process_id'])
+        columns['process_name'].append(item['process_name'])
+        columns['group_index'].append(item.get('group_index', -1))
+        columns['source_id'].append(item['source_id'])
+        columns['name'].append(item['name'])
+        columns['description'].append(item['description'])
+        columns['parent_id'].append(item['parent_ids'][0] if item['parent_ids'] else None)
+        columns['source_parent_id'].append(item.get('source_parent_id'))
+
+    table = pa.table({
+        'id': pa.array(columns['id'], pa.string()),
+        'type': pa.array(columns['type'], pa.string()).dictionary_encode(),
+        'process_id': pa.array(columns['process_id'], pa.string()),
+        'process_name': pa.array(columns['process_name'], pa.string()),
+        'group_index': pa.array(columns['group_index'], pa.int16()),
+        'source_id': pa.array(columns['source_id'], pa.string()),
+        'name': pa.array(columns['name'], pa.string()),
+        'description': pa.array(columns['description'], pa.string()),
+        'parent_id': pa.array(columns['parent_id'], pa.string()),
+        'source_parent_id': pa.array(columns['source_parent_id'], pa.string())
+    })
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    os.replace(tmp_path, path)
+
+# Read selected columns, optionally only for some processes (by process_name) and item types
+def read_rcm_table(path: str, columns: Optional[List[str]] = None, processes: Optional[List[str]] = None,
+                   types: Optional[List[str]] = None):
+    import pyarrow.parquet as pq
+
+    filters = []
+    if processes is not None:
+        filters.append(('process_name', 'in', list(processes)))
+    if types is not None:
+        filters.append(('type', 'in', list(types)))
+    return pq.read_table(path, columns=columns, filters=filters or None)
+
+def list_processes(path: str) -> List[str]:
+    return read_rcm_table(path, columns=['process_name'], types=['process']).column('process_name').to_pylist()
+
+# Columns needed to rebuild the nested records, in the order load_rcm_parquet unpacks them
+NESTED_COLUMNS = ['type', 'process_id', 'group_index', 'id', 'source_id', 'name', 'description', 'parent_id', 'source_parent_id']
+
+# Rebuild the nested BodyRCMs dicts (as written to rcm_output.json) from the flattened rows.
+# Each column is converted to Python once and the rows are walked by position, rather than
+# materializing a dict per row with table.to_pylist(). The dictionary-encoded type column is
+# cast to plain strings first; converting it directly is far slower than all other columns.
+def load_rcm_parquet(path: str, processes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    import pyarrow as pa
+
+    table = read_rcm_table(path, columns=NESTED_COLUMNS, processes=processes)
+    types, process_ids, group_indexes, ids, source_ids, names, descriptions, parent_ids, source_parent_ids = (
+        (table.column(column).cast(pa.string()) if column == 'type' else table.column(column)).to_pylist()
+        for column in NESTED_COLUMNS)
+
+    rcm_data = []
+    by_process = {}
+    standards = {}
+    for i, item_type in enumerate(types):
+        if item_type == 'process':
+            process = {'process_name': names[i], 'list_standards': []}
+            by_process[process_ids[i]] = process
+            rcm_data.append(process)
+            continue
+
+        groups = by_process[process_ids[i]]['list_standards']
+        while len(groups) <= group_indexes[i]:
+            groups.append({'standard': [], 'controls': [], 'risks': []})
+        group = groups[group_indexes[i]]
+
+        if item_type == 'standard':
+            standard = {'id': source_ids[i], 'name': names[i], 'description': descriptions[i], 'requirements': []}
+            standards[ids[i]] = standard
+            group['standard'].append(standard)
+        elif item_type == 'requirement':
+            standards[parent_ids[i]]['requirements'].append(
+                {'id': source_ids[i], 'name': names[i], 'description': descriptions[i]})
+        elif item_type == 'control':
+            group['controls'].append({'id': source_ids[i], 'name': names[i], 'description': descriptions[i],
+                                      'standard_id': source_parent_ids[i]})
+        elif item_type == 'risk':
+            group['risks'].append({'id': source_ids[i], 'name': names[i], 'description': descriptions[i],
+                                   'control_id': source_parent_ids[i]})
+    return rcm_data
@@ -0,0 +1,133 @@
+import hashlib
+from typing import List, Dict, Any, Iterator
+
+# Item type -> Chroma collection holding items of that type
+COLLECTIONS = {
+    'process': 'processes',
+    'standard': 'standards',
+    'requirement': 'requirements',
+    'control': 'controls',
+    'risk': 'risks'
+}
+
+ID_PREFIXES = {
+    'process': 'PROC',
+    'standard': 'STD',
+    'requirement': 'REQ',
+    'control': 'CTRL',
+    'risk': 'RISK'
+}
+
+# Stable key of a process: a hash of its name, so its items keep their ids when other processes
+# are added, removed or reordered
+def process_key(process_name: str) -> str:
+    return hashlib.sha1(process_name.encode('utf-8')).hexdigest()[:12]
+
+def generate_id(prefix, process_key, item_index):
+    return f"{prefix}_{process_key}_{item_index:03d}"
+
+# Flatten the nested BodyRCMs structure into one row per process, standard, requirement, control and risk.
+# IDs are scoped per process because the LLM-assigned IDs (STD-0001, CTRL-0001, ...) repeat across processes;
+# a repeated process name gets a numbered key so its ids stay unique.
+# parent_ids holds the scoped IDs of the item one level up the process -> standard -> requirement / control -> risk hierarchy.
+def flatten_rcm(rcm_data: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    seen_keys = {}
+    for process in rcm_data:
+        key = process_key(process['process_name'])
+        seen_keys[key] = seen_keys.get(key, 0) + 1
+        if seen_keys[key] > 1:
+            key = f"{key}-{seen_keys[key]}"
+        process_id = generate_id(ID_PREFIXES['process'], key, 0)
+        yield {
+            'id': process_id,
+            'type': 'process',
+            'process_id': process_id,
+            'process_name': process['process_name'],
+            'source_id': '',
+            'name': process['process_name'],
+            'description': process['process_name'],
+            'parent_ids': []
+        }
+
+        counters = {'standard': 0, 'requirement': 0, 'control': 0, 'risk': 0}
+        standard_ids = {}
+        control_ids = {}
+
+        def next_id(item_type):
+            item_id = generate_id(ID_PREFIXES[item_type], key, counters[item_type])
+            counters[item_type] += 1
+            return item_id
+
+        for group_index, standard_group in enumerate(process['list_standards']):
+            for standard in standard_group['standard']:
+                standard_id = next_id('standard')
+                standard_ids.setdefault(standard['id'], standard_id)
+                yield {
+                    'id': standard_id,
+                    'type': 'standard',
+                    'process_id': process_id,
+                    'process_name': process['process_name'],
+                    'source_id': standard['id'],
+                    'name': standard['name'],
+                    'description': standard['description'],
+                    'parent_ids': [process_id],
+                    'group_index': group_index
+                }
+
+                for requirement in standard['requirements']:
+                    yield {
+                        'id': next_id('requirement'),
+                        'type': 'requirement',
+                        'process_id': process_id,
+                        'process_name': process['process_name'],
+                        'source_id': requirement['id'],
+                        'name': requirement['name'],
+                        'description': requirement['description'],
+                        'parent_ids': [standard_id],
+                        'group_index': group_index
+                    }
+
+            for control in standard_group['controls']:
+                control_id = next_id('control')
+                control_ids.setdefault(control['id'], control_id)
+                parent = standard_ids.get(control['standard_id'])
+                yield {
+                    'id': control_id,
+                    'type': 'control',
+                    'process_id': process_id,
+                    'process_name': process['process_name'],
+                    'source_id': control['id'],
+                    'name': control['name'],
+                    'description': control['description'],
+                    'parent_ids': [parent] if parent else [],
+                    'source_parent_id': control['standard_id'],
+                    'group_index': group_index
+                }
+
+            for risk in standard_group['risks']:
+                parent = control_ids.get(risk['control_id'])
+                yield {
+                    'id': next_id('risk'),
+                    'type': 'risk',
+                    'process_id': process_id,
+                    'process_name': process['process_name'],
+                    'source_id': risk['id'],
+                    'name': risk['name'],
+                    'description': risk['description'],
+                    'parent_ids': [parent] if parent else [],
+                    'source_parent_id': risk['control_id'],
+                    'group_index': group_index
+                }
+
+# Document and metadata stored in Chroma for a flattened item
+def chroma_record(item: Dict[str, Any]):
+    item_type = item['type']
+    if item_type == 'process':
+        return item['name'], {'description': item['name']}
+    if item_type == 'standard':
+        return item['name'], {'process_id': item['process_id'], 'description': item['description']}
+    if item_type == 'requirement':
+        return item['description'], {'standard_id': item['parent_ids'][0], 'process_id': item['process_id'], 'name': item['name']}
+    if item_type == 'control':
+        return item['description'], {'standard_id': item['source_parent_id'], 'process_id': item['process_id'], 'name': item['name']}
+    return item['description'], {'control_id': item['source_parent_id'], 'process_id': item['process_id'], 'name': item['name']}
@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Dict, Any, Optional
+import numpy as np
+from streamlit_functions.process_diff import process_text, normalize_name
+
+# Semantic reuse cache in front of RCM generation. Every generated RCM is stored in a persistent
+# SQLite library with the embedding of its process ("name: description"); before the next
+# generation the process is embedded the same way and, if the closest stored process is at least
+# IRIS_RCM_REUSE_THRESHOLD similar, that RCM is returned with the new process name instead of
+# calling the model. Entries are keyed by the embedding model version, so switching
+# IRIS_EMBEDDING_MODEL starts an empty library rather than comparing incompatible vectors.
+#
+# Processes the incremental diff marked changed skip the lookup (generate_rcm passes reuse=False),
+# and an entry of the same process (same normalized name) with a different description is never
+# reused, so an edited description is always regenerated.
+#
+# Set IRIS_RCM_LIBRARY to another path, or to an empty string to disable the library.
+
+LIBRARY_PATH = os.getenv('IRIS_RCM_LIBRARY', 'rcm_library.sqlite3')
+REUSE_THRESHOLD = float(os.getenv('IRIS_RCM_REUSE_THRESHOLD', '0.92'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rcms (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    process_name TEXT NOT NULL,
+    description TEXT,
+    embedding BLOB NOT NULL,
+    rcm TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rcms_model ON rcms(model);
+"""
+
+class RCMLibrary:
+    def __init__(self, path: str, embedding_service, threshold: float = REUSE_THRESHOLD):
+        self.path = path
+        self.embedding_service = embedding_service
+        self.threshold = threshold
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'stored': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._ids: List[int] = []
+        self._keys: List[tuple] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    @property
+    def model(self) -> str:
+        return self.embedding_service.version
+
+    def _embed(self, process: Dict[str, str]) -> np.ndarray:
+        vector = np.asarray(self.embedding_service.embed_documents([process_text(process)])[0], dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    @staticmethod
+    def _key(process: Dict[str, str]) -> tuple:
+        return normalize_name(process['name']), normalize_name(process.get('description', ''))
+
+    # Stored vectors for the current model, loaded once and appended to as RCMs are stored
+    def _load(self):
+        if self._matrix is not None:
+            return
+        rows = self._conn.execute("SELECT id, embedding, process_name, description FROM rcms WHERE model = ? ORDER BY id", (self.model,)).fetchall()
+        self._ids = [row[0] for row in rows]
+        self._keys = [self._key({'name': row[2], 'description': row[3] or ''}) for row in rows]
+        vectors = [np.asarray(array('f', row[1]), dtype=np.float32) for row in rows]
+        self._matrix = np.vstack(vectors) if vectors else None
+
+    # Closest stored RCM as (rcm dict renamed to the process, similarity), or None below the threshold
+    def lookup(self, process: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        vector = self._embed(process)
+        with self._lock:
+            self._load()
+            self.stats['lookups'] += 1
+            match = None
+            if self._matrix is not None:
+                scores = self._matrix @ vector
+                name, description = self._key(process)
+                for position, key in enumerate(self._keys):
+                    if key[0] == name and key[1] != description:
+                        scores[position] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = (self._ids[best], float(scores[best]))
+            if match is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            with self._conn:
+                self._conn.execute("UPDATE rcms SET hits = hits + 1 WHERE id = ?", (match[0],))
+            row = self._conn.execute("SELECT process_name, rcm FROM rcms WHERE id = ?", (match[0],)).fetchone()
+        return {
+            'rcm': {**json.loads(row[1]), 'process_name': process['name']},
+            'source_process': row[0],
+            'similarity': round(match[1], 4)
+        }
+
+    def store(self, process: Dict[str, str], rcm: Dict[str, Any]):
+        vector = self._embed(process)
+        with self._lock:
+            self._load()
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO rcms (model, process_name, description, embedding, rcm, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.model, process['name'], process.get('description', ''), array('f', vector.tolist()).tobytes(), json.dumps(rcm), time.time())
+                )
+            self._ids.append(cursor.lastrowid)
+            self._keys.append(self._key(process))
+            self._matrix = vector[None, :] if self._matrix is None else np.vstack([self._matrix, vector])
+            self.stats['stored'] += 1
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            size, reused = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM rcms WHERE model = ?", (self.model,)
+            ).fetchone()
+            stats = dict(self.stats)
+        return {
+            'path': self.path,
+            'threshold': self.threshold,
+            'entries': size,
+            'reused_total': reused,
+            **stats,
+            'hit_rate': round(stats['hits'] / stats['lookups'], 3) if stats['lookups'] else None
+        }
+
+_library: Optional[RCMLibrary] = None
+_library_lock = threading.Lock()
+
+# Process-wide library on the shared embedding service, or None when IRIS_RCM_LIBRARY is empty
+def get_rcm_library() -> Optional[RCMLibrary]:
+    global _library
+    if not LIBRARY_PATH:
+        return None
+    with _library_lock:
+        if _library is None:
+            from streamlit_functions.embedding_service import get_embedding_service
+            _library = RCMLibrary(LIBRARY_PATH, get_embedding_service())
+        return _library
+
+def library_stats() -> Optional[Dict[str, Any]]:
+    return _library.describe() if _library is not None else None
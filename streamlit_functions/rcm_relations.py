@@ -0,0 +1,156 @@
+import sqlite3
+from typing import List, Dict, Any, Tuple
+from streamlit_functions.rcm_items import flatten_rcm
+
+# File name of the side-store inside the Chroma db_path
+RELATIONS_DB = "rcm_relations.sqlite3"
+
+# Relational mirror of the RCM hierarchy kept next to the Chroma collections.
+# Chroma stores the same relationships as metadata, but every lookup there is a separate
+# `where` query; here joins and aggregates over the foreign-key indexes are single queries.
+SCHEMA = """
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS processes (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS standards (
+    id TEXT PRIMARY KEY,
+    process_id TEXT NOT NULL REFERENCES processes(id) ON DELETE CASCADE,
+    source_id TEXT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_standards_process ON standards(process_id);
+
+CREATE TABLE IF NOT EXISTS requirements (
+    id TEXT PRIMARY KEY,
+    process_id TEXT NOT NULL REFERENCES processes(id) ON DELETE CASCADE,
+    standard_id TEXT REFERENCES standards(id) ON DELETE CASCADE,
+    source_id TEXT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_requirements_process ON requirements(process_id);
+CREATE INDEX IF NOT EXISTS idx_requirements_standard ON requirements(standard_id);
+
+CREATE TABLE IF NOT EXISTS controls (
+    id TEXT PRIMARY KEY,
+    process_id TEXT NOT NULL REFERENCES processes(id) ON DELETE CASCADE,
+    standard_id TEXT REFERENCES standards(id) ON DELETE SET NULL,
+    source_id TEXT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_controls_process ON controls(process_id);
+CREATE INDEX IF NOT EXISTS idx_controls_standard ON controls(standard_id);
+
+CREATE TABLE IF NOT EXISTS risks (
+    id TEXT PRIMARY KEY,
+    process_id TEXT NOT NULL REFERENCES processes(id) ON DELETE CASCADE,
+    control_id TEXT REFERENCES controls(id) ON DELETE SET NULL,
+    source_id TEXT,
+    name TEXT NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_risks_process ON risks(process_id);
+CREATE INDEX IF NOT EXISTS idx_risks_control ON risks(control_id);
+"""
+
+TABLES = {
+    'process': 'processes',
+    'standard': 'standards',
+    'requirement': 'requirements',
+    'control': 'controls',
+    'risk': 'risks'
+}
+
+PARENT_COLUMNS = {
+    'standard': 'process_id',
+    'requirement': 'standard_id',
+    'control': 'standard_id',
+    'risk': 'control_id'
+}
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+# Upsert the flattened RCM items and drop rows whose ids are no longer produced, mirroring what
+# initialize_chroma_db syncs into the collections
+def sync_rcm_relations(rcm_data: List[Dict[str, Any]], db_path: str):
+    rows = {'process': [], 'standard': [], 'requirement': [], 'control': [], 'risk': []}
+    for item in flatten_rcm(rcm_data):
+        if item['type'] == 'process':
+            rows['process'].append((item['id'], item['name']))
+        elif item['type'] == 'standard':
+            rows['standard'].append((item['id'], item['process_id'], item['source_id'], item['name'], item['description']))
+        else:
+            parent = item['parent_ids'][0] if item['parent_ids'] else None
+            rows[item['type']].append((item['id'], item['process_id'], parent, item['source_id'], item['name'], item['description']))
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("CREATE TEMP TABLE keep_ids (id TEXT PRIMARY KEY)")
+            for item_type, table in TABLES.items():
+                conn.execute("DELETE FROM keep_ids")
+                conn.executemany("INSERT OR IGNORE INTO keep_ids (id) VALUES (?)", [(row[0],) for row in rows[item_type]])
+                conn.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT id FROM keep_ids)")
+            conn.executemany("INSERT OR REPLACE INTO processes (id, name) VALUES (?, ?)", rows['process'])
+            conn.executemany("INSERT OR REPLACE INTO standards (id, process_id, source_id, name, description) VALUES (?, ?, ?, ?, ?)", rows['standard'])
+            for item_type in ('requirement', 'control', 'risk'):
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {item_type}s (id, process_id, {PARENT_COLUMNS[item_type]}, source_id, name, description) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows[item_type]
+                )
+    finally:
+        conn.close()
+
+def _query(db_path: str, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+    conn = connect(db_path)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+def risk_counts_per_control(db_path: str, min_risks: int = 1, limit: int = -1) -> List[Dict[str, Any]]:
+    return _query(db_path, """
+        SELECT c.id, c.name, c.description, COUNT(r.id) AS risk_count
+        FROM controls c JOIN risks r ON r.control_id = c.id
+        GROUP BY c.id
+        HAVING COUNT(r.id) >= ?
+        ORDER BY risk_count DESC, c.id
+        LIMIT ?
+    """, (min_risks, limit))
+
+def controls_addressing_multiple_risks(db_path: str, limit: int = 5) -> List[Dict[str, Any]]:
+    return risk_counts_per_control(db_path, min_risks=2, limit=limit)
+
+def standard_counts_per_process(db_path: str, limit: int = -1) -> List[Dict[str, Any]]:
+    return _query(db_path, """
+        SELECT p.id, p.name, COUNT(s.id) AS standard_count
+        FROM processes p LEFT JOIN standards s ON s.process_id = p.id
+        GROUP BY p.id
+        ORDER BY standard_count DESC, p.id
+        LIMIT ?
+    """, (limit,))
+
+def standards_for_process(db_path: str, process_id: str) -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM standards WHERE process_id = ? ORDER BY id", (process_id,))
+
+def requirements_for_standard(db_path: str, standard_id: str) -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM requirements WHERE standard_id = ? ORDER BY id", (standard_id,))
+
+def controls_for_standard(db_path: str, standard_id: str) -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM controls WHERE standard_id = ? ORDER BY id", (standard_id,))
+
+def risks_for_process(db_path: str, process_id: str) -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM risks WHERE process_id = ? ORDER BY id", (process_id,))
+
+def risks_without_controls(db_path: str) -> List[Dict[str, Any]]:
+    return _query(db_path, "SELECT * FROM risks WHERE control_id IS NULL ORDER BY id")
@@ -0,0 +1,28 @@
+import json
+import os
+from typing import List, Dict, Any
+
+# Dashboard aggregates for an RCM output, computed once when the output is written and stored
+# next to it (<name>.summary.json), so the Inventory tab reads counts instead of re-summing
+# every process on every rerun.
+
+def summary_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + '.summary.json'
+
+def summarize_rcm(rcm_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    processes = []
+    for process in rcm_data:
+        processes.append({
+            'process_name': process['process_name'],
+            'standards': sum(len(standard_group['standard']) for standard_group in process['list_standards']),
+            'requirements': sum(len(standard['requirements']) for standard_group in process['list_standards'] for standard in standard_group['standard']),
+            'controls': sum(len(standard_group['controls']) for standard_group in process['list_standards']),
+            'risks': sum(len(standard_group['risks']) for standard_group in process['list_standards'])
+        })
+    totals = {key: sum(process[key] for process in processes) for key in ('standards', 'requirements', 'controls', 'risks')}
+    totals['processes'] = len(processes)
+    return {'processes': processes, 'totals': totals}
+
+def write_rcm_summary(rcm_data: List[Dict[str, Any]], json_path: str):
+    with open(summary_path_for(json_path), 'w') as f:
+        json.dump(summarize_rcm(rcm_data), f, indent=2)
@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+# Lightweight nested-span tracing for pipeline runs (document ingestion, RCM generation, index
+# builds, retrieval). A run is opened with trace_run(); spans opened in its context (the code it
+# wraps and the asyncio tasks and to_thread calls started from there) are recorded with their
+# parent span and exported on exit as a Chrome trace
+# (<dir>/<run>-<timestamp>.json, open it in Perfetto or chrome://tracing) plus a summary of
+# total and self time per span name. Runs are context-local, so concurrent Streamlit sessions
+# each get their own trace.
+#
+# Tracing is off unless IRIS_TRACE_DIR is set (or trace_run gets an output_dir); traces/ is
+# git-ignored for IRIS_TRACE_DIR=traces. While no run is active span() returns a shared no-op
+# context manager and @traced calls straight through.
+
+TRACE_DIR = os.getenv('IRIS_TRACE_DIR')
+
+_current_run: ContextVar[Optional['TraceRun']] = ContextVar('trace_run', default=None)
+_parent: ContextVar[Optional[int]] = ContextVar('trace_parent', default=None)
+_span_ids = itertools.count(1)
+_NOOP = nullcontext()
+
+class TraceRun:
+    def __init__(self, name: str):
+        self.name = name
+        self.origin = time.perf_counter_ns()
+        self.events: List[Dict[str, Any]] = []
+        self.lanes: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    # Concurrent asyncio tasks get their own lane so their spans nest correctly in the viewer
+    def lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        with self.lock:
+            return self.lanes.setdefault(key, len(self.lanes) + 1)
+
+    def record(self, span: '_Span', end: int, error: bool):
+        event = {
+            'name': span.name,
+            'ph': 'X',
+            'ts': (span.start - self.origin) / 1000,
+            'dur': (end - span.start) / 1000,
+            'pid': os.getpid(),
+            'tid': span.lane,
+            'args': {**span.args, 'span_id': span.id, 'parent_id': span.parent, 'error': error}
+        }
+        with self.lock:
+            self.events.append(event)
+
+class _Span:
+    __slots__ = ('name', 'args', 'id', 'parent', 'lane', 'start', 'run', '_token')
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.id = next(_span_ids)
+        self.parent = _parent.get()
+        self._token = _parent.set(self.id)
+        self.run = _current_run.get()
+        self.lane = self.run.lane() if self.run is not None else 0
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        _restore(_parent, self._token, self.parent)
+        if self.run is not None:
+            self.run.record(self, end, exc_type is not None)
+        return False
+
+# A generator abandoned mid-stream (e.g. a Streamlit session that navigated away) can be finalized
+# in another context than the one that set the variable; reset() refuses that, so restore the
+# previous value explicitly
+def _restore(variable: ContextVar, token, previous):
+    try:
+        variable.reset(token)
+    except ValueError:
+        variable.set(previous)
+
+def span(name: str, **args):
+    if _current_run.get() is None:
+        return _NOOP
+    return _Span(name, args)
+
+def traced(name: Optional[str] = None):
+    def decorator(func):
+        span_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_run.get() is None:
+                    return await func(*args, **kwargs)
+                with _Span(span_name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_run.get() is None:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Count, total and self time (total minus direct children) per span name. self_pct is relative
+# to the run's wall-clock time, so concurrent spans (e.g. parallel LLM calls) can sum past 100%
+def summarize(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    child_time: Dict[int, float] = {}
+    for event in events:
+        parent = event['args']['parent_id']
+        if parent is not None:
+            child_time[parent] = child_time.get(parent, 0.0) + event['dur']
+    run_duration = max((event['dur'] for event in events if event['args']['parent_id'] is None), default=0.0)
+
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        entry = by_name.setdefault(event['name'], {'span': event['name'], 'count': 0, 'total_ms': 0.0, 'self_ms': 0.0, 'errors': 0})
+        entry['count'] += 1
+        entry['total_ms'] += event['dur'] / 1000
+        entry['self_ms'] += max(0.0, event['dur'] - child_time.get(event['args']['span_id'], 0.0)) / 1000
+        entry['errors'] += int(event['args']['error'])
+
+    summary = sorted(by_name.values(), key=lambda entry: entry['self_ms'], reverse=True)
+    for entry in summary:
+        entry['total_ms'] = round(entry['total_ms'], 1)
+        entry['self_ms'] = round(entry['self_ms'], 1)
+        entry['self_pct'] = round(100 * entry['self_ms'] * 1000 / run_duration, 1) if run_duration else 0.0
+    return summary
+
+def format_summary(name: str, summary: List[Dict[str, Any]]) -> str:
+    lines = [f"Where did the time go ({name}):", f"{'span':<40} {'count':>6} {'total ms':>11} {'self ms':>11} {'self %':>7}"]
+    for entry in summary:
+        lines.append(f"{entry['span'][:40]:<40} {entry['count']:>6} {entry['total_ms']:>11.1f} {entry['self_ms']:>11.1f} {entry['self_pct']:>7.1f}")
+    return "\n".join(lines)
+
+# Record every span in this context until exit, then write the trace and print the summary.
+# Runs do not nest: inside an active run this is just another span.
+@contextmanager
+def trace_run(name: str, output_dir: Optional[str] = None):
+    output_dir = output_dir or TRACE_DIR
+    if not output_dir:
+        yield None
+        return
+
+    run = _current_run.get()
+    if run is not None:
+        with span(name):
+            yield run
+        return
+
+    run = TraceRun(name)
+    token = _current_run.set(run)
+    try:
+        with _Span(name, {}):
+            yield run
+    finally:
+        _restore(_current_run, token, None)
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        with open(f"{base}.json", 'w') as f:
+            json.dump({'traceEvents': run.events, 'displayTimeUnit': 'ms'}, f)
+        summary = summarize(run.events)
+        with open(f"{base}.summary.json", 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(format_summary(name, summary))
+        print(f"Trace saved to {base}.json")
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Iterable, Optional
+from streamlit_functions.rcm_items import COLLECTIONS
+from streamlit_functions.tracing import span
+
+# Vector backend used for the RCM collections: "chroma" (default) or "numpy" (memory-mapped brute force).
+# Set IRIS_VECTOR_BACKEND to switch without code changes.
+DEFAULT_BACKEND = os.getenv('IRIS_VECTOR_BACKEND', 'chroma')
+
+# Subdirectory of db_path used by the numpy backend, so both backends can share one db_path
+NUMPY_SUBDIR = "numpy_store"
+
+# Process-wide pool of vector clients and collection handles, shared by every Streamlit session
+# and script in the process. Clients are keyed by (db_path, backend) and opened once under a lock,
+# so concurrent sessions no longer race to open the same SQLite files; collection handles are
+# resolved once per (db_path, backend, name, embedding version). Handles time their data
+# operations so pool_health() can report per-operation latency.
+
+LATENCY_WINDOW = 1024
+TIMED_OPERATIONS = ('add', 'upsert', 'update', 'delete', 'get', 'query', 'count')
+
+_clients: Dict[Any, Any] = {}
+_handles: Dict[Any, 'PooledCollection'] = {}
+_lock = threading.RLock()
+_latencies: Dict[str, deque] = {}
+_errors: Dict[str, int] = {}
+stats = {'client_opens': 0, 'client_hits': 0, 'handle_opens': 0, 'handle_hits': 0}
+
+def _record(operation: str, seconds: float, ok: bool = True):
+    with _lock:
+        _latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW)).append(seconds * 1000)
+        if not ok:
+            _errors[operation] = _errors.get(operation, 0) + 1
+
+class PooledCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name not in TIMED_OPERATIONS:
+            return attribute
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                with span(f"vector:{name}", collection=self._collection.name):
+                    result = attribute(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                _record(name, time.perf_counter() - start, ok)
+        return timed
+
+def _open_client(db_path: str, backend: str):
+    if backend == 'chroma':
+        import chromadb
+        return chromadb.PersistentClient(path=db_path)
+    if backend == 'numpy':
+        from streamlit_functions.numpy_store import NumpyVectorClient
+        return NumpyVectorClient(os.path.join(db_path, NUMPY_SUBDIR))
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+def get_vector_client(db_path: str, backend: str = None):
+    backend = backend or DEFAULT_BACKEND
+    key = (os.path.abspath(db_path), backend)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            stats['client_hits'] += 1
+            return client
+        start = time.perf_counter()
+        client = _open_client(db_path, backend)
+        _record('open_client', time.perf_counter() - start)
+        _clients[key] = client
+        stats['client_opens'] += 1
+        return client
+
+# With an EmbeddingService the collection is tagged with (or checked against) its model version
+def get_collection(db_path: str, name: str, embedding_service=None, backend: str = None, create: bool = True):
+    backend = backend or DEFAULT_BACKEND
+    key = (os.path.abspath(db_path), backend, name, embedding_service.version if embedding_service is not None else None)
+    with _lock:
+        handle = _handles.get(key)
+        if handle is not None:
+            stats['handle_hits'] += 1
+            return handle
+
+        client = get_vector_client(db_path, backend)
+        embedding_function = embedding_service.embedding_function() if embedding_service is not None else None
+        start = time.perf_counter()
+        if create:
+            collection = client.get_or_create_collection(name, embedding_function=embedding_function)
+        else:
+            collection = client.get_collection(name, embedding_function=embedding_function)
+        if embedding_service is not None:
+            embedding_service.bind(collection)
+        _record('open_collection', time.perf_counter() - start)
+
+        handle = PooledCollection(collection)
+        _handles[key] = handle
+        stats['handle_opens'] += 1
+        return handle
+
+def get_collections(db_path: str, names: Iterable[str], embedding_service=None, backend: str = None) -> Dict[str, Any]:
+    return {name: get_collection(db_path, name, embedding_service, backend) for name in names}
+
+def get_rcm_collections(db_path: str, embedding_service=None, backend: str = None) -> Dict[str, Any]:
+    return get_collections(db_path, COLLECTIONS.values(), embedding_service, backend)
+
+# Drop pooled clients and handles, e.g. after deleting collections or the db directory
+def evict(db_path: Optional[str] = None):
+    with _lock:
+        path = os.path.abspath(db_path) if db_path is not None else None
+        for key in [key for key in _handles if path is None or key[0] == path]:
+            del _handles[key]
+        for key in [key for key in _clients if path is None or key[0] == path]:
+            del _clients[key]
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def latency_summary() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        snapshot = {operation: list(values) for operation, values in _latencies.items()}
+        errors = dict(_errors)
+    return {
+        operation: {
+            'count': len(values),
+            'errors': errors.get(operation, 0),
+            'p50_ms': round(_percentile(values, 0.5), 2),
+            'p95_ms': round(_percentile(values, 0.95), 2)
+        }
+        for operation, values in snapshot.items() if values
+    }
+
+# Heartbeat every pooled client and report pool counters and operation latencies
+def pool_health() -> Dict[str, Any]:
+    with _lock:
+        clients = list(_clients.items())
+        n_handles = len(_handles)
+        counters = dict(stats)
+
+    report = []
+    for (path, backend), client in clients:
+        start = time.perf_counter()
+        try:
+            if hasattr(client, 'heartbeat'):
+                client.heartbeat()
+            else:
+                client.list_collections()
+            status = 'ok'
+        except Exception as e:
+            status = f"error: {str(e)}"
+        report.append({'path': path, 'backend': backend, 'status': status,
+                       'latency_ms': round((time.perf_counter() - start) * 1000, 2)})
+    return {'clients': report, 'collections': n_handles, **counters, 'operations': latency_summary()}
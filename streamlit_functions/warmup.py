@@ -0,0 +1,78 @@
+import importlib
+import os
+import threading
+import time
+from typing import List, Dict, Any, Callable, Tuple
+
+# Background warm-up for the Streamlit app. The app imports only what the landing page needs;
+# after the first render start_warmup() preloads everything else on a daemon thread, in the order
+# the tabs need it: plotting and dataframes, the vector collections and embedding model used by
+# inventory search, then the LLM client and the generation and ingestion pipelines. Each step runs
+# once per process and its outcome is kept for warmup_status(). A step that fails is only
+# reported; the code path that needs it imports or loads it again on first use.
+#
+# Set IRIS_WARMUP=0 to disable.
+
+WARMUP_ENABLED = os.getenv('IRIS_WARMUP', '1') != '0'
+
+_status: List[Dict[str, Any]] = []
+_thread = None
+_lock = threading.Lock()
+
+def _import(name: str) -> Callable[[], Any]:
+    return lambda: importlib.import_module(name)
+
+def _open_collections(db_path: str):
+    if not os.path.isdir(db_path):
+        return None
+    from streamlit_functions.vector_store import get_rcm_collections
+    from streamlit_functions.embedding_service import get_embedding_service
+    return get_rcm_collections(db_path, get_embedding_service())
+
+def _load_embedding_model():
+    from streamlit_functions.embedding_service import get_embedding_service
+    return get_embedding_service().embed_query("warm-up")
+
+def _build_llm_client():
+    from streamlit_functions.llm_client import get_instructor_client
+    return get_instructor_client()
+
+def warmup_steps(db_path: str = "./chroma_db") -> List[Tuple[str, Callable[[], Any]]]:
+    return [
+        ('import plotly', _import('plotly.graph_objects')),
+        ('import pandas', _import('pandas')),
+        ('vector collections', lambda: _open_collections(db_path)),
+        ('embedding model', _load_embedding_model),
+        ('llm client', _build_llm_client),
+        ('import generate_rcm', _import('streamlit_functions.generate_rcm')),
+        ('import ingest_document', _import('streamlit_functions.ingest_document')),
+        ('import PyPDF2', _import('PyPDF2'))
+    ]
+
+def _run(steps: List[Tuple[str, Callable[[], Any]]]):
+    for entry, (_, step) in zip(_status, steps):
+        entry['status'] = 'running'
+        start = time.perf_counter()
+        try:
+            step()
+            entry['status'] = 'done'
+        except Exception as e:
+            entry['status'] = f"error: {type(e).__name__}: {str(e)}"[:200]
+        entry['seconds'] = round(time.perf_counter() - start, 2)
+
+# Idempotent: the first call in the process starts the thread, later calls return immediately
+def start_warmup(db_path: str = "./chroma_db") -> bool:
+    global _thread
+    if not WARMUP_ENABLED:
+        return False
+    with _lock:
+        if _thread is not None:
+            return False
+        steps = warmup_steps(db_path)
+        _status.extend({'step': name, 'status': 'pending', 'seconds': None} for name, _ in steps)
+        _thread = threading.Thread(target=_run, args=(steps,), name="iris-warmup", daemon=True)
+        _thread.start()
+        return True
+
+def warmup_status() -> List[Dict[str, Any]]:
+    return [dict(entry) for entry in _status]